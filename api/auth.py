@@ -1,5 +1,6 @@
 """Authentication utilities for the API."""
 
+import hmac
 import os
 
 from fastapi import HTTPException, Security
@@ -23,9 +24,11 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
     if not api_key:
         raise HTTPException(status_code=403, detail="API key required")
 
-    if not os.getenv("HUMBLE_CLAY_API_KEY"):
+    expected_key = os.getenv("HUMBLE_CLAY_API_KEY")
+    if not expected_key:
         raise HTTPException(status_code=500, detail="API key not configured on server")
 
-    if api_key != os.getenv("HUMBLE_CLAY_API_KEY"):
+    # Constant-time comparison so response timing doesn't leak the key
+    if not hmac.compare_digest(api_key.encode(), expected_key.encode()):
         raise HTTPException(status_code=403, detail="Invalid API key")
     return api_key
@@ -2,230 +2,221 @@
 
 import asyncio
 import logging
+import os
 import time
-from typing import List, Optional, Tuple, Type
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
 
 import logfire
+from fastapi import BackgroundTasks
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 
+from ..field_extraction import validate_extraction_config
 from ..llm.processor import process_with_llm
-from ..logging.setup import (
-    log_batch_item_error,
-    log_batch_metrics,
-    log_batch_summary,
-)
+from ..logging.setup import log_batch_item_error, log_batch_summary
 from ..models import (
     MultiplePromptsRequest,
     MultiplePromptsResponse,
     PromptRequest,
     PromptResponse,
 )
-from ..response.handlers import prepare_prompt_response
-from ..schema.dynamic import create_dynamic_model_from_schema
+from ..response.handlers import prepare_error_response, prepare_prompt_response
+from ..schema.dynamic import (
+    build_trivial_field_prompt,
+    get_request_trivial_field,
+    resolve_schema_for,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Default batch size
-DEFAULT_BATCH_SIZE = 100
+# Default maximum number of concurrent LLM calls per batch request
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("HUMBLE_CLAY_CONCURRENCY", "16"))
 
+# Item errors logged individually per error type; the rest are only counted
+MAX_LOGGED_ITEM_ERRORS = 5
 
-async def prepare_prompt_request(
-    prompt_request: PromptRequest,
-) -> Tuple[str, Optional[Type[BaseModel]], bool]:
+# Marks a response format not resolved yet (None means it failed to resolve)
+_UNRESOLVED = object()
+
+
+def resolve_batch_schemas(
+    prompt_requests: List[PromptRequest],
+) -> List[Optional[Tuple[str, Optional[Type[BaseModel]], bool]]]:
     """
-    Prepare a prompt request for processing.
+    Resolve each distinct response format of a batch only once.
+
+    Sheets batches almost always use one schema for every row, so the schema
+    is resolved for the first prompt using it and reused for the others
+    instead of being walked and looked up once per item.
 
     Args:
-        prompt_request: The prompt request to prepare
+        prompt_requests: The prompt requests of the batch
 
     Returns:
-        Tuple containing:
-        - The prompt text
-        - Response model (if schema provided)
-        - Boolean indicating if the request has a schema
+        A resolved (prompt, response model, has_schema) tuple per prompt, or
+        None where the prompt has to be resolved on its own
     """
-    response_model = None
-    has_schema = False
+    # (response_format, extract_field_path, (model, has_schema, trivial field))
+    seen: List[Tuple[Dict[str, Any], Optional[str], Optional[tuple]]] = []
+    resolved: List[Optional[Tuple[str, Optional[Type[BaseModel]], bool]]] = []
+
+    for prompt_request in prompt_requests:
+        response_format = prompt_request.response_format
+        if response_format is None:
+            resolved.append((prompt_request.prompt, None, False))
+            continue
 
-    # Check if we need a structured schema
-    if (
-        prompt_request.response_format
-        and prompt_request.response_format.get("type") == "json_schema"
-    ):
-        has_schema = True
-        json_schema = prompt_request.response_format.get("json_schema", {})
-        if json_schema and "schema" in json_schema:
-            # Create a dynamic Pydantic model from provided schema
-            schema_name = json_schema.get("name", "DynamicSchema")
-            schema_obj = json_schema["schema"]
+        shared = next(
+            (
+                entry
+                for fmt, field_path, entry in seen
+                if field_path == prompt_request.extract_field_path
+                and fmt == response_format
+            ),
+            _UNRESOLVED,
+        )
+        if shared is _UNRESOLVED:
+            try:
+                _, response_model, has_schema = resolve_schema_for(prompt_request)
+                trivial_field = get_request_trivial_field(prompt_request)
+                shared = (response_model, has_schema, trivial_field)
+            except Exception:
+                # Let each item report the schema error as its own error response
+                shared = None
+            seen.append((response_format, prompt_request.extract_field_path, shared))
+
+        if shared is None:
+            resolved.append(None)
+            continue
 
-            # Create a model with proper enum handling
-            response_model = create_dynamic_model_from_schema(schema_name, schema_obj)
+        response_model, has_schema, trivial_field = shared
+        prompt = prompt_request.prompt
+        if trivial_field:
+            schema_obj = response_format["json_schema"]["schema"]
+            prompt = build_trivial_field_prompt(prompt, trivial_field, schema_obj)
+        resolved.append((prompt, response_model, has_schema))
 
-    return prompt_request.prompt, response_model, has_schema
+    return resolved
 
 
-async def process_batch(
+async def process_prompt_request(
     llm_client: AsyncOpenAI,
-    batch: List[PromptRequest],
-    batch_number: int,
-    total_batches: int,
-    batch_start_time: float,
-    total_prompts: int,
-    completed: int,
-    failed: int,
-    first_result_time: Optional[float],
-) -> Tuple[List[PromptResponse], int, int, Optional[float]]:
+    prompt_request: PromptRequest,
+    resolved_schema: Optional[Tuple[str, Optional[Type[BaseModel]], bool]] = None,
+) -> PromptResponse:
     """
-    Process a batch of prompts.
+    Process a single prompt request end to end.
+
+    Shared by the single and multiple prompt endpoints: resolves the schema,
+    calls the LLM and prepares the PromptResponse.
 
     Args:
-        batch: List of prompt requests to process
-        batch_number: The current batch number
-        total_batches: The total number of batches
-        batch_start_time: The start time of the batch processing
-        total_prompts: The total number of prompts across all batches
-        completed: Number of prompts already completed
-        failed: Number of prompts already failed
-        first_result_time: Timestamp of the first result (if any)
+        llm_client: The LLM client to use
+        prompt_request: The prompt request to process
+        resolved_schema: Already resolved (prompt, response model, has_schema)
+            tuple, resolved from the request if omitted
 
     Returns:
-        Tuple containing:
-        - List of processed responses
-        - Number of successfully completed prompts in this batch
-        - Number of failed prompts in this batch
-        - First result timestamp (if first prompt in entire process)
-    """
-    batch_size = len(batch)
-    batch_start = time.time()
+        PromptResponse for the prompt
 
-    # PHASE 1: Prepare all requests (sequential)
-    prepared_requests = []
-    for i, prompt_request in enumerate(batch):
-        try:
-            prompt, response_model, has_schema = await prepare_prompt_request(
-                prompt_request
-            )
-            prepared_requests.append(
-                (i, prompt_request, prompt, response_model, has_schema)
-            )
-        except Exception as e:
-            # Handle preparation errors
-            logger.error(f"Error preparing request: {e}")
-            prepared_requests.append((i, prompt_request, None, None, False))
-
-    # PHASE 2: Execute LLM calls (concurrent)
-    llm_tasks = []
-    for _, _, prompt, response_model, _ in prepared_requests:
-        if prompt is None:  # Skip failed preparations
-            llm_tasks.append(None)
-            continue
+    Raises:
+        ValueError: If the field extraction can't succeed for this request
+        Exception: If schema resolution or the LLM call fails
+    """
+    if resolved_schema is None:
+        resolved_schema = resolve_schema_for(prompt_request)
+    prompt, response_model, has_schema = resolved_schema
 
-        # Create task for LLM processing
-        task = process_with_llm(llm_client, prompt, response_model=response_model)
-        llm_tasks.append(task)
+    # Extraction errors that don't depend on the LLM output skip the call
+    if prompt_request.extract_field_path:
+        validate_extraction_config(prompt_request.extract_field_path, has_schema)
 
-    # Wait for all LLM tasks to complete
-    llm_responses = await asyncio.gather(
-        *[task for task in llm_tasks if task is not None], return_exceptions=True
+    response_data = await process_with_llm(
+        llm_client, prompt, response_model=response_model
     )
 
-    # Reconstruct the response list with correct ordering
-    ordered_responses = [None] * len(prepared_requests)
-    response_idx = 0
-    for i, (req_idx, _, _, _, _) in enumerate(prepared_requests):
-        if llm_tasks[i] is not None:
-            ordered_responses[req_idx] = llm_responses[response_idx]
-            response_idx += 1
-
-    # PHASE 3: Process responses (sequential)
-    batch_responses = []
-    batch_completed = 0
-    batch_failed = 0
-    new_first_result_time = first_result_time
-
-    for i, (req_idx, prompt_request, _, _, has_schema) in enumerate(prepared_requests):
-        item_start = time.time()
-        try:
-            if llm_tasks[i] is None:
-                # Request preparation failed
-                raise ValueError("Failed to prepare request")
-
-            response_data = ordered_responses[req_idx]
-
-            # Check if the response is an exception
-            if isinstance(response_data, Exception):
-                raise response_data
-
-            # Use the response handler to prepare the response
-            response = prepare_prompt_response(
-                response_data,
-                extract_field_path=prompt_request.extract_field_path,
-                has_schema=has_schema,
-            )
+    # Trivial single-field schema: the raw text, minus the whitespace or
+    # trailing newline models often add, is the field value
+    if has_schema and response_model is None and isinstance(response_data, str):
+        trivial_field = get_request_trivial_field(prompt_request)
+        if trivial_field:
+            response_data = {trivial_field: response_data.strip()}
+
+    # Use the response handler to prepare the response
+    return prepare_prompt_response(
+        response_data,
+        extract_field_path=prompt_request.extract_field_path,
+        has_schema=has_schema,
+    )
 
-            # Add the response to batch responses
-            batch_responses.append(response)
 
-            # Update completion status based on response
-            if response.status == "error":
-                batch_failed += 1
-            else:
-                batch_completed += 1
+async def process_batch_item(
+    llm_client: AsyncOpenAI,
+    prompt_request: PromptRequest,
+    semaphore: asyncio.Semaphore,
+    resolved_schema: Optional[Tuple[str, Optional[Type[BaseModel]], bool]] = None,
+    error_counts: Optional[Dict[str, int]] = None,
+) -> PromptResponse:
+    """
+    Process one prompt of a batch, converting any failure to an error response.
 
-                # Record first result time if it's first completion in entire process
-                if new_first_result_time is None and completed + batch_completed == 1:
-                    new_first_result_time = time.time()
+    Args:
+        llm_client: The LLM client to use
+        prompt_request: The prompt request to process
+        semaphore: Semaphore bounding the number of concurrent LLM calls
+        resolved_schema: Schema resolved once for the whole batch, if shared
+        error_counts: Per error type failure counts shared by the batch; only
+            the first MAX_LOGGED_ITEM_ERRORS errors of each type are logged
 
-        except ValueError as e:
-            # Handle validation errors
-            item_duration = time.time() - item_start
-            log_batch_item_error(
-                e, prompt_request.prompt, item_duration, error_type="validation"
+    Returns:
+        PromptResponse for the prompt, with status "error" on failure
+    """
+    async with semaphore:
+        # Measured from here so time spent queued isn't counted as the item's
+        item_start = time.perf_counter()
+        try:
+            return await process_prompt_request(
+                llm_client, prompt_request, resolved_schema
             )
-            batch_responses.append(PromptResponse(status="error", error=str(e)))
-            batch_failed += 1
-
         except Exception as e:
-            # Handle other errors
-            item_duration = time.time() - item_start
-            log_batch_item_error(e, prompt_request.prompt, item_duration)
-            batch_responses.append(PromptResponse(status="error", error=str(e)))
-            batch_failed += 1
-
-    # Calculate batch duration and update span with performance metrics
-    batch_duration = time.time() - batch_start
-    log_batch_metrics(
-        batch_number,
-        batch_size,
-        batch_completed,
-        batch_failed,
-        batch_duration,
-    )
-
-    # Log performance metrics to standard logger for debugging
-    avg_time_per_request = batch_duration / batch_size if batch_size > 0 else 0
-    logger.info(
-        f"Batch {batch_number} performance: total={batch_duration:.2f}s, "
-        f"avg={avg_time_per_request:.2f}s/request, concurrent_requests={batch_size}"
-    )
-
-    return batch_responses, batch_completed, batch_failed, new_first_result_time
+            # ValueErrors are validation errors, anything else a processing error
+            error_type = "validation" if isinstance(e, ValueError) else "processing"
+            if error_counts is not None:
+                error_counts[error_type] = error_counts.get(error_type, 0) + 1
+                should_log = error_counts[error_type] <= MAX_LOGGED_ITEM_ERRORS
+            else:
+                should_log = True
+            if should_log:
+                item_duration = time.perf_counter() - item_start
+                log_batch_item_error(
+                    e, prompt_request.prompt, item_duration, error_type=error_type
+                )
+            return prepare_error_response(str(e))
 
 
 async def process_multiple_prompts(
     llm_client: AsyncOpenAI,
     request: MultiplePromptsRequest,
-    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    on_result: Optional[Callable[[int, PromptResponse], None]] = None,
+    background_tasks: Optional[BackgroundTasks] = None,
 ) -> MultiplePromptsResponse:
     """
-    Process multiple prompts in batches.
+    Process multiple prompts concurrently.
+
+    All prompts are submitted at once and a semaphore keeps at most
+    max_concurrency LLM calls in flight, so a slow prompt never holds back the
+    start of the others.
 
     Args:
+        llm_client: The LLM client to use
         request: The MultiplePromptsRequest containing prompts to process
-        batch_size: The maximum number of prompts to process (concurrently) in a batch
+        max_concurrency: The maximum number of prompts processed concurrently
+        on_result: Optional callback called with the prompt index and its
+            response as soon as each prompt completes
+        background_tasks: If given, the batch summary is logged after the
+            response has been sent instead of on the request path
 
     Returns:
         MultiplePromptsResponse with all processed responses
@@ -237,68 +228,132 @@ async def process_multiple_prompts(
         "batch_processing",
         attributes={
             "total_prompts": total_prompts,
-            "batch_size": batch_size,
+            "max_concurrency": max_concurrency,
         },
     ):
         # Initialize counters and timing
-        batch_start_time = time.time()
-        all_responses = []
-        completed = 0
-        failed = 0
+        batch_start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(max_concurrency)
         first_result_time = None
-
-        # Process prompts in batches
-        for i in range(0, total_prompts, batch_size):
-            batch = request.prompts[i : i + batch_size]
-            batch_number = i // batch_size + 1
-            total_batches = (total_prompts + batch_size - 1) // batch_size
-
-            # Process batch with its own span
-            with logfire.span(
-                f"batch_{batch_number}",
-                attributes={
-                    "batch_number": batch_number,
-                    "total_batches": total_batches,
-                    "batch_size": len(batch),
-                    "offset": i,
-                },
-            ):
-                # Process this batch
-                (
-                    batch_responses,
-                    batch_completed,
-                    batch_failed,
-                    new_first_result_time,
-                ) = await process_batch(
-                    llm_client,
-                    batch,
-                    batch_number,
-                    total_batches,
-                    batch_start_time,
-                    total_prompts,
-                    completed,
-                    failed,
-                    first_result_time,
+        # Failed LLM calls per error type. Identical prompts share one call, so
+        # unlike the per-prompt "failed" count a shared failure counts once.
+        error_counts: Dict[str, int] = {}
+        resolved_schemas = resolve_batch_schemas(request.prompts)
+
+        # Fan out every prompt under one aggregate span rather than a span per
+        # item. Errors are already converted to error responses. Identical
+        # prompts (same text, schema and extraction) share one LLM call.
+        with logfire.span("batch_llm_processing", attributes={"count": total_prompts}):
+            # Start the longest prompts first so that, once the semaphore is
+            # saturated, short prompts fill the tail instead of a long one
+            # straggling at the end (longest processing time first)
+            dispatch_order = sorted(
+                range(total_prompts), key=lambda i: -len(request.prompts[i].prompt)
+            )
+            tasks: List[asyncio.Future] = [None] * total_prompts
+            shared_tasks: Dict[tuple, asyncio.Future] = {}
+            for index in dispatch_order:
+                prompt_request = request.prompts[index]
+                resolved_schema = resolved_schemas[index]
+                key = (
+                    (resolved_schema, prompt_request.extract_field_path)
+                    if resolved_schema is not None
+                    else None
                 )
-
-                # Update tracking variables
-                all_responses.extend(batch_responses)
-                completed += batch_completed
-                failed += batch_failed
-
-                # Update first result time if this batch produced the first result
-                if first_result_time is None and new_first_result_time is not None:
-                    first_result_time = new_first_result_time
+                task = shared_tasks.get(key) if key is not None else None
+                if task is None:
+                    task = asyncio.ensure_future(
+                        process_batch_item(
+                            llm_client,
+                            prompt_request,
+                            semaphore,
+                            resolved_schema,
+                            error_counts,
+                        )
+                    )
+                    if key is not None:
+                        shared_tasks[key] = task
+                tasks[index] = task
+
+            if on_result is not None:
+                for index, task in enumerate(tasks):
+                    task.add_done_callback(
+                        lambda t, i=index: t.cancelled() or on_result(i, t.result())
+                    )
+
+            unique_tasks = set(tasks)
+            try:
+                # Wait for results as they complete to capture the first result time
+                for next_result in asyncio.as_completed(unique_tasks):
+                    response = await next_result
+                    if response.status != "error" and first_result_time is None:
+                        first_result_time = time.perf_counter()
+            finally:
+                # Don't leave LLM calls running if the batch itself is cancelled
+                for task in unique_tasks:
+                    task.cancel()
+
+        # Tasks keep the original prompt order
+        all_responses = [task.result() for task in tasks]
+        failed = sum(response.status == "error" for response in all_responses)
+        completed = total_prompts - failed
 
         # Calculate total duration and update span with summary metrics
-        total_duration = time.time() - batch_start_time
-        log_batch_summary(
+        total_duration = time.perf_counter() - batch_start_time
+        summary = (
             total_prompts,
             completed,
             failed,
             total_duration,
             first_result_time,
             batch_start_time,
+            error_counts,
         )
+        if background_tasks is not None:
+            background_tasks.add_task(log_batch_summary, *summary)
+        else:
+            log_batch_summary(*summary)
+
+        # Every item is an already built PromptResponse
+        return MultiplePromptsResponse.model_construct(responses=all_responses)
+
+
+async def stream_multiple_prompts(
+    llm_client: AsyncOpenAI,
+    request: MultiplePromptsRequest,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> AsyncIterator[Tuple[int, PromptResponse]]:
+    """
+    Process multiple prompts concurrently, yielding responses as they complete.
 
-        return MultiplePromptsResponse(responses=all_responses)
+    Responses come in completion order, each with the index of its prompt, so
+    the first one arrives after the fastest LLM call instead of the slowest.
+    The batch runs in its own task; closing the iterator cancels it.
+
+    Args:
+        llm_client: The LLM client to use
+        request: The MultiplePromptsRequest containing prompts to process
+        max_concurrency: The maximum number of prompts processed concurrently
+
+    Yields:
+        Tuples of the prompt index and its PromptResponse
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    batch = asyncio.ensure_future(
+        process_multiple_prompts(
+            llm_client,
+            request,
+            max_concurrency,
+            on_result=lambda index, response: queue.put_nowait((index, response)),
+        )
+    )
+    # Every result is queued before the batch finishes, so None marks the end
+    batch.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while (item := await queue.get()) is not None:
+            yield item
+        # Surface a batch level failure to the caller
+        batch.result()
+    finally:
+        batch.cancel()
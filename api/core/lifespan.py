@@ -12,6 +12,16 @@ from fastapi import FastAPI
 
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by all LLM calls; HTTP/2 multiplexes concurrent
+# requests to OpenRouter over a few long-lived connections.
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Retries of 408/409/429/5xx responses and connection errors. The OpenAI SDK
+# backs off exponentially with jitter and honors Retry-After, so a rate
+# limited batch item costs latency instead of failing.
+LLM_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "4"))
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
@@ -34,6 +44,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
             logger.info(
                 "Lifespan: OPENROUTER_API_KEY found. Attempting to create client."
             )
+            app.state.http_client = httpx.AsyncClient(
+                http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+            )
             llm_client_instance = instructor.patch(
                 openai.AsyncOpenAI(
                     base_url=openrouter_base_url,
@@ -41,7 +54,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
                     default_headers={
                         "HTTP-Referer": "https://github.com/jsnyde0/humble-clay"
                     },
-                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    timeout=HTTP_TIMEOUT,
+                    max_retries=LLM_MAX_RETRIES,
+                    http_client=app.state.http_client,
                 )
             )
             if llm_client_instance:
@@ -90,3 +105,15 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
             logger.info(
                 "Lifespan: No LLM client instance was available in app.state to close."
             )
+
+        http_client = getattr(app.state, "http_client", None)
+        if http_client:
+            try:
+                await http_client.aclose()
+                logger.info("Lifespan: Shared HTTP client closed.")
+            except Exception as e_close:
+                logger.error(
+                    f"Lifespan: EXCEPTION during HTTP client close: {e_close}",
+                    exc_info=True,
+                )
+            app.state.http_client = None
@@ -1,6 +1,54 @@
 """Utilities for extracting fields from structured data."""
 
-from typing import Any, Union
+from functools import lru_cache
+from typing import Any, Tuple, Union
+
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+
+@lru_cache(maxsize=256)
+def compile_field_path(field_path: str) -> Tuple[str, ...]:
+    """Split a dot-notation field path into its keys, once per distinct path.
+
+    Every prompt of a batch usually extracts the same path, so the split is
+    cached instead of being redone for each response.
+
+    Args:
+        field_path: A dot-notation path to the field (e.g., "user.address.city")
+
+    Returns:
+        The path keys, in order
+
+    Raises:
+        ValueError: If the field path is empty or has empty parts
+    """
+    parts = tuple(field_path.split(".")) if field_path else ()
+    if not parts or not all(parts):
+        raise ValueError("Invalid field path format")
+    return parts
+
+
+def validate_extraction_config(field_path: str, has_schema: bool) -> Tuple[str, ...]:
+    """Validate the parts of an extraction request that don't depend on the data.
+
+    Lets callers reject a request before making the LLM call whose output
+    extract_field_validated would reject anyway.
+
+    Args:
+        field_path: A dot-notation path to the field (e.g., "user.address.city")
+        has_schema: Whether a schema was provided
+
+    Returns:
+        The compiled path keys
+
+    Raises:
+        ValueError: If no schema was provided or the path format is invalid
+    """
+    if not has_schema:
+        raise ValueError("Field extraction requires a schema")
+
+    return compile_field_path(field_path)
 
 
 def extract_field(
@@ -23,19 +71,8 @@ def extract_field(
             f"Cannot extract fields from non-structured data type: {type(data)}"
         )
 
-    # Validate field path format
-    if not field_path or not all(part for part in field_path.split(".")):
-        raise ValueError("Invalid field path format")
-
-    # Handle top-level field
-    if "." not in field_path:
-        if isinstance(data, dict) and field_path in data:
-            return data[field_path]
-        else:
-            raise ValueError(f"Field not found: {field_path}")
-
-    # Handle nested fields
-    parts = field_path.split(".")
+    # Validate and split the field path, cached per distinct path
+    parts = compile_field_path(field_path)
     current = data
 
     for i, part in enumerate(parts):
@@ -68,3 +105,50 @@ def validate_field_extraction_request(
         raise ValueError(
             f"Cannot extract fields from non-structured data: {type(data).__name__}"
         )
+
+
+def extract_field_validated(
+    data: Any, field_path: str, has_schema: bool
+) -> Union[str, int, float, bool, dict, list, None]:
+    """Validate a field extraction request and extract the field in one pass.
+
+    Equivalent to validate_field_extraction_request followed by extract_field,
+    but splits the path and walks the data only once. Pydantic models are
+    walked through their fields, so they don't need to be dumped first.
+
+    Args:
+        data: The structured data to extract from (a dict, list or model)
+        field_path: A dot-notation path to the field (e.g., "user.address.city")
+        has_schema: Whether a schema was provided
+
+    Returns:
+        The extracted field value, which could be any JSON-compatible type
+
+    Raises:
+        ValueError: If the request is invalid or the field is not found
+    """
+    if not has_schema:
+        raise ValueError("Field extraction requires a schema")
+
+    if not isinstance(data, (dict, list, BaseModel)):
+        raise ValueError(
+            f"Cannot extract fields from non-structured data: {type(data).__name__}"
+        )
+
+    parts = compile_field_path(field_path)
+
+    current = data
+    for i, part in enumerate(parts):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, BaseModel) and part in type(current).model_fields:
+            current = getattr(current, part)
+        else:
+            full_path = ".".join(parts[: i + 1])
+            raise ValueError(f"Field not found: {full_path}")
+
+    # Only the extracted value of a model is dumped, nested models included
+    if isinstance(current, (BaseModel, dict, list)) and isinstance(data, BaseModel):
+        return to_jsonable_python(current, by_alias=False)
+
+    return current
@@ -1,12 +1,15 @@
 """LLM processing implementation using Instructor and OpenAI client for OpenRouter."""
 
+import asyncio
 import logging
 import os
-from typing import Type, TypeVar
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type, TypeVar
 
 import httpx
 import instructor
 import openai
+from instructor import OpenAISchema, openai_schema
 from pydantic import BaseModel
 
 # Define logger for this module
@@ -27,6 +30,16 @@ if not openrouter_api_key:
     logger.warning("OPENROUTER_API_KEY environment variable not found!")
 
 
+@lru_cache(maxsize=256)
+def _instructor_schema(response_model: Type[BaseModel]) -> Type[BaseModel]:
+    """Wrap a response model for Instructor once instead of on every call.
+
+    Instructor wraps plain Pydantic models with openai_schema, creating a new
+    model class and validator per call, unless they already are OpenAISchemas.
+    """
+    return openai_schema(response_model)
+
+
 def create_llm_client():
     client = instructor.patch(
         openai.AsyncOpenAI(
@@ -41,6 +54,22 @@ def create_llm_client():
     return client
 
 
+class _InFlightCall:
+    """An LLM call shared by every caller waiting on it."""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: asyncio.Future) -> None:
+        self.future = future
+        self.waiters = 0
+
+
+# LLM calls currently in flight, keyed by client, prompt, response model and
+# model. Entries are removed as soon as the call finishes, so only concurrent
+# identical calls share a result; nothing is cached afterwards.
+_in_flight: Dict[Tuple[Any, ...], _InFlightCall] = {}
+
+
 async def process_with_llm(
     llm_client: openai.AsyncOpenAI,
     prompt: str,
@@ -49,6 +78,9 @@ async def process_with_llm(
 ) -> T | str:
     """Process prompt with OpenRouter API, optionally returning a Pydantic model.
 
+    A call identical to one already in flight (e.g. the same cell prompt from
+    two concurrent requests) awaits that call instead of making another.
+
     Args:
         prompt: The user prompt to send to the LLM.
         response_model: Optional Pydantic model to structure the response.
@@ -61,19 +93,66 @@ async def process_with_llm(
     Raises:
         Exception: If the API key is not configured or if the API call fails.
     """
-    api_key_check = os.getenv("OPENROUTER_API_KEY")
-    if not api_key_check:
+    # id() is stable here: the running call keeps the client alive
+    key = (id(llm_client), prompt, response_model, model)
+    call = _in_flight.get(key)
+    if call is None:
+        call = _InFlightCall(
+            asyncio.ensure_future(_call_llm(llm_client, prompt, response_model, model))
+        )
+        _in_flight[key] = call
+        call.future.add_done_callback(lambda _: _forget_in_flight(key, call))
+
+    call.waiters += 1
+    try:
+        # Shielded so one caller being cancelled doesn't fail the others
+        return await asyncio.shield(call.future)
+    finally:
+        call.waiters -= 1
+        # The last caller to give up stops the call instead of leaving it
+        # running, and unregisters it so new callers start a fresh one
+        if call.waiters == 0 and not call.future.done():
+            _forget_in_flight(key, call)
+            call.future.cancel()
+
+
+def _forget_in_flight(key: Tuple[Any, ...], call: _InFlightCall) -> None:
+    """Unregister an in-flight call unless a newer one took its key."""
+    if _in_flight.get(key) is call:
+        del _in_flight[key]
+
+
+async def _call_llm(
+    llm_client: openai.AsyncOpenAI,
+    prompt: str,
+    response_model: Type[T] | None,
+    model: str,
+) -> T | str:
+    """Make one LLM call; see process_with_llm for the arguments."""
+    # The client is built with the key at startup, so check it there rather
+    # than reading the environment on every call
+    if not getattr(llm_client, "api_key", None):
         logger.error("OpenRouter API key not configured at time of call.")
         raise Exception("OpenRouter API key not configured")
 
     messages = [{"role": "user", "content": prompt}]
+    # Lazy %-formatting: this runs once per batch item, usually with debug off
     logger.debug(
-        f"Attempting LLM call. Model: {model}, Response Model: {response_model}, Prompt Snippet: {prompt[:50]}..."
+        "Attempting LLM call. Model: %s, Response Model: %s, Prompt Snippet: %s...",
+        model,
+        response_model,
+        prompt[:50],
     )
 
     try:
         if response_model:
             logger.debug("Using Instructor for structured response.")
+            if (
+                isinstance(response_model, type)
+                and issubclass(response_model, BaseModel)
+                and not issubclass(response_model, OpenAISchema)
+            ):
+                response_model = _instructor_schema(response_model)
             response = await llm_client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -97,30 +176,34 @@ async def process_with_llm(
                 raise Exception("Invalid response structure received from API")
 
     except httpx.TimeoutException as e:
-        logger.error(f"LLM call timed out: {e}", exc_info=True)
+        logger.error("LLM call timed out: %s", e, exc_info=True)
         raise Exception(f"LLM call timed out: {str(e)}") from e
     except httpx.ConnectError as e:
         # Log ConnectError specifically
-        logger.error(f"LLM connection error: {e}", exc_info=True)
+        logger.error("LLM connection error: %s", e, exc_info=True)
         raise Exception(f"Connection error: {str(e)}") from e
     except openai.APIConnectionError as e:
         # Log OpenAI's specific connection error
-        logger.error(f"OpenAI APIConnectionError: {e}", exc_info=True)
+        logger.error("OpenAI APIConnectionError: %s", e, exc_info=True)
         raise Exception(f"Connection error: {str(e)}") from e
     except openai.APIStatusError as e:
         logger.error(
-            f"OpenAI API Status Error (e.g., 4xx, 5xx): {e.status_code} - {e.response}",
+            "OpenAI API Status Error (e.g., 4xx, 5xx): %s - %s",
+            e.status_code,
+            e.response,
             exc_info=True,
         )
         raise Exception(f"OpenRouter API status error {e.status_code}: {str(e)}") from e
     except openai.APIError as e:
         # Handle other OpenAI API errors
-        logger.error(f"OpenAI API Error: {e}", exc_info=True)
+        logger.error("OpenAI API Error: %s", e, exc_info=True)
         raise Exception(f"OpenRouter API error: {str(e)}") from e
     except Exception as e:
         # Handle other unexpected errors
         logger.error(
-            f"Unexpected error during LLM processing: {type(e).__name__} - {e}",
+            "Unexpected error during LLM processing: %s - %s",
+            type(e).__name__,
+            e,
             exc_info=True,
         )
         raise Exception(f"Unexpected error: {str(e)}") from e
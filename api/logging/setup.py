@@ -1,7 +1,7 @@
 """Logfire configuration and logging helpers."""
 
 import logging
-from typing import Optional
+from typing import Dict, Optional
 
 import logfire
 from fastapi import FastAPI
@@ -88,6 +88,7 @@ def log_batch_summary(
     total_duration: float,
     first_result_time: Optional[float] = None,
     batch_start_time: Optional[float] = None,
+    error_counts: Optional[Dict[str, int]] = None,
 ) -> None:
     """
     Log summary metrics for the entire batch processing.
@@ -99,6 +100,9 @@ def log_batch_summary(
         total_duration: Total processing time in seconds
         first_result_time: Time when first result was completed (optional)
         batch_start_time: Time when batch processing started (optional)
+        error_counts: Number of failed LLM calls per error type (optional);
+            identical prompts share one call, so these can sum to less than
+            failed
     """
     # Calculate time to first result if available
     time_to_first_result = None
@@ -123,6 +127,7 @@ def log_batch_summary(
         total_duration_seconds=round(total_duration, 2),
         time_to_first_result=time_to_first_result,
         avg_time_per_item=avg_time,
+        error_counts=error_counts or {},
     )
 
 
@@ -147,4 +152,4 @@ def log_batch_item_error(
         item_duration=round(item_duration, 2),
     )
 
-    logger.error(f"Batch item {error_type} error: {error_message}")
+    logger.error("Batch item %s error: %s", error_type, error_message)
@@ -3,6 +3,7 @@
 import logging
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 # Core modules
 from .core.lifespan import lifespan
@@ -38,6 +39,8 @@ app = FastAPI(
     description="Backend API for Humble Clay - AI-powered Google Sheets add-on",
     version="0.1.0",
     lifespan=lifespan,
+    # orjson serializes large batch responses much faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
 # Apply Logfire instrumentation and logging setup (can stay here)
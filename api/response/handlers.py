@@ -3,13 +3,82 @@
 import logging
 from typing import Any, Dict, Optional, Union
 
-from ..field_extraction import extract_field, validate_field_extraction_request
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from ..field_extraction import extract_field_validated
 from ..models import PromptResponse
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+def prepare_error_response(message: str) -> PromptResponse:
+    """
+    Build an error PromptResponse without running Pydantic validation.
+
+    Args:
+        message: The error message
+
+    Returns:
+        PromptResponse with status "error"
+    """
+    # Both fields are plain strings we control, so validation can be skipped.
+    # Passing every field also spares model_construct the default lookups.
+    return PromptResponse.model_construct(status="error", response=None, error=message)
+
+
+def prepare_success_response(response: Any) -> PromptResponse:
+    """
+    Build a success PromptResponse without running Pydantic validation.
+
+    Args:
+        response: The formatted (JSON-compatible) response value
+
+    Returns:
+        PromptResponse with status "success"
+    """
+    # The value comes from our own formatting of the LLM output
+    return PromptResponse.model_construct(
+        status="success", response=response, error=None
+    )
+
+
+def to_json_response(response: BaseModel) -> Response:
+    """
+    Serialize an already built response model straight to JSON.
+
+    Returning a Response instance makes FastAPI skip validating and
+    serializing the result against the route's response_model again, which
+    otherwise costs a Pydantic roundtrip per batch item. The model is encoded
+    in one pass by pydantic-core, without building intermediate dicts. The
+    response_model is kept on the routes for the OpenAPI docs.
+
+    Args:
+        response: The response model to send
+
+    Returns:
+        JSON Response with the serialized model as body
+    """
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
+
+def to_ndjson_line(index: Optional[int], response: PromptResponse) -> bytes:
+    """
+    Encode one streamed batch response as an NDJSON line.
+
+    Args:
+        index: Index of the prompt the response belongs to, or None for an
+            error ending the whole stream
+        response: The prompt response
+
+    Returns:
+        The JSON encoded response, including its index, and a newline
+    """
+    return orjson.dumps({"index": index, **response.model_dump()}) + b"\n"
+
+
 def format_response_data(response_data: Any) -> Union[Dict[str, Any], Any]:
     """
     Format the LLM response data into a consistent structure based on its type.
@@ -20,26 +89,26 @@ def format_response_data(response_data: Any) -> Union[Dict[str, Any], Any]:
     Returns:
         Formatted response - either a dict or the original response
     """
-    # Handle different response types (dict, Pydantic model, or string)
-    if hasattr(response_data, "model_dump"):
-        # It's a Pydantic model
-        return response_data.model_dump()
-    elif isinstance(response_data, dict):
-        # It's already a dict
-        return response_data
-    else:
-        # It's a string or other type - keep as is
+    # Plain strings and dicts are the common case; an exact type check skips
+    # the ABC machinery behind isinstance(..., BaseModel)
+    if type(response_data) in (str, dict):
         return response_data
 
+    if isinstance(response_data, BaseModel):
+        return response_data.model_dump()
+    return response_data
+
 
 def extract_requested_field(
-    response_dict: Dict[str, Any], extract_field_path: Optional[str], has_schema: bool
+    response_dict: Union[Dict[str, Any], BaseModel],
+    extract_field_path: Optional[str],
+    has_schema: bool,
 ) -> Union[Dict[str, Any], Any]:
     """
     Extract a specific field from the response if requested.
 
     Args:
-        response_dict: The response dictionary
+        response_dict: The response dictionary or structured response model
         extract_field_path: Path to the field to extract
         has_schema: Whether a schema was provided
 
@@ -49,11 +118,17 @@ def extract_requested_field(
     if not extract_field_path:
         return response_dict
 
-    # Validate the extraction request
-    validate_field_extraction_request(response_dict, extract_field_path, has_schema)
+    # Top-level key of a plain dict, the common case: a single lookup
+    if (
+        has_schema
+        and type(response_dict) is dict
+        and "." not in extract_field_path
+        and extract_field_path in response_dict
+    ):
+        return response_dict[extract_field_path]
 
-    # Extract the requested field
-    return extract_field(response_dict, extract_field_path)
+    # Validate the extraction request and extract the requested field
+    return extract_field_validated(response_dict, extract_field_path, has_schema)
 
 
 def prepare_prompt_response(
@@ -72,28 +147,24 @@ def prepare_prompt_response(
     Returns:
         PromptResponse with properly formatted data
     """
-    # Format the response based on its type
-    formatted_response = format_response_data(response_data)
-
-    # Handle string responses directly if no field extraction
-    if not isinstance(formatted_response, dict) and not extract_field_path:
-        return PromptResponse(response=formatted_response)
-
-    # If it's not a dict but field extraction is requested, wrap it
-    if not isinstance(formatted_response, dict) and extract_field_path:
-        formatted_response = {"result": formatted_response}
-
-    # Extract specific field if requested
-    if extract_field_path:
-        try:
-            extracted_value = extract_requested_field(
-                formatted_response, extract_field_path, has_schema
-            )
-            return PromptResponse(response=extracted_value)
-        except ValueError as e:
-            # Handle field extraction errors
-            logger.error(f"Field extraction error: {str(e)}")
-            return PromptResponse(status="error", error=str(e))
-
     # Return the full response if no extraction requested
-    return PromptResponse(response=formatted_response)
+    if not extract_field_path:
+        return prepare_success_response(format_response_data(response_data))
+
+    # Dicts and models (walked directly, not dumped) are extracted from as is;
+    # anything else is wrapped so the field can be extracted
+    if isinstance(response_data, (dict, BaseModel)):
+        formatted_response = response_data
+    else:
+        formatted_response = {"result": response_data}
+
+    # Extract the requested field
+    try:
+        extracted_value = extract_requested_field(
+            formatted_response, extract_field_path, has_schema
+        )
+        return prepare_success_response(extracted_value)
+    except ValueError as e:
+        # Handle field extraction errors
+        logger.error("Field extraction error: %s", e)
+        return prepare_error_response(str(e))
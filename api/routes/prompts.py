@@ -3,17 +3,19 @@
 import logging
 
 import openai  # For type hinting if not already via models
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from ..auth import verify_api_key
-from ..batch.processor import process_multiple_prompts
+from ..batch.processor import (
+    process_multiple_prompts,
+    process_prompt_request,
+    stream_multiple_prompts,
+)
 
 # Core dependencies
 from ..core.dependencies import get_llm_client
 
-# Business logic / processors
-from ..llm.processor import process_with_llm
-
 # Models
 from ..models import (
     MultiplePromptsRequest,
@@ -21,8 +23,11 @@ from ..models import (
     PromptRequest,
     PromptResponse,
 )
-from ..response.handlers import prepare_prompt_response
-from ..schema.dynamic import create_dynamic_model_from_schema
+from ..response.handlers import (
+    prepare_error_response,
+    to_json_response,
+    to_ndjson_line,
+)
 
 router = APIRouter(
     prefix="/api/v1",
@@ -49,45 +54,34 @@ async def process_single_prompt_route(
     field will be extracted from the structured response.
     """
     try:
-        response_model = None
-        has_schema = False
-
-        if (
-            prompt_request.response_format
-            and prompt_request.response_format.get("type") == "json_schema"
-        ):
-            has_schema = True
-            json_schema = prompt_request.response_format.get("json_schema", {})
-            if json_schema and "schema" in json_schema:
-                schema_name = json_schema.get("name", "DynamicSchema")
-                schema_obj = json_schema["schema"]
-                response_model = create_dynamic_model_from_schema(
-                    schema_name, schema_obj
-                )
-
-        response_data = await process_with_llm(
-            llm_client,
-            prompt_request.prompt,
-            response_model=response_model if response_model else None,
-        )
-
-        return prepare_prompt_response(
-            response_data,
-            extract_field_path=prompt_request.extract_field_path,
-            has_schema=has_schema,
-        )
+        # Resolved in here so a schema that can't be built is reported as a
+        # status="error" response, like any other failure of the prompt
+        response = await process_prompt_request(llm_client, prompt_request)
+        return to_json_response(response)
 
     except ValueError as e:
-        logger.error(f"Validation error in /prompt: {str(e)}")
-        return PromptResponse(status="error", error=str(e))
+        logger.error("Validation error in /prompt: %s", e)
+        return to_json_response(prepare_error_response(str(e)))
     except Exception as e:
-        logger.error(f"Error processing /prompt: {str(e)}")
-        return PromptResponse(status="error", error=str(e))
-
-
-@router.post("/prompts", response_model=MultiplePromptsResponse)
+        logger.error("Error processing /prompt: %s", e)
+        return to_json_response(prepare_error_response(str(e)))
+
+
+@router.post(
+    "/prompts",
+    response_model=MultiplePromptsResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "A MultiplePromptsResponse, or with ?stream=true one "
+            "indexed PromptResponse per NDJSON line",
+        }
+    },
+)
 async def process_multiple_prompts_route(
     prompt_request: MultiplePromptsRequest,
+    background_tasks: BackgroundTasks,
+    stream: bool = False,
     api_key: str = Depends(verify_api_key),
     llm_client: openai.AsyncOpenAI = Depends(get_llm_client),
 ):
@@ -99,16 +93,39 @@ async def process_multiple_prompts_route(
 
     If extract_field_path is provided along with a schema, the specified
     field will be extracted from the structured responses.
+
+    With ?stream=true the responses are streamed as NDJSON in completion
+    order, one PromptResponse per line with the "index" of its prompt. If
+    the batch fails mid-stream, a last error line with a null "index" ends
+    the stream.
     """
+    if stream:
+
+        async def ndjson_lines():
+            try:
+                async for index, response in stream_multiple_prompts(
+                    llm_client, prompt_request
+                ):
+                    yield to_ndjson_line(index, response)
+            except Exception as e:
+                # The 200 is already sent, so report the failure in the stream
+                logger.error("Error streaming /prompts: %s", e)
+                yield to_ndjson_line(
+                    None, prepare_error_response(f"Error processing batch: {str(e)}")
+                )
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
     # Note: The `request: Request` object is not directly needed here if
     # get_llm_client correctly sources from app.state without needing the request object itself
     # for that specific piece of information. It is passed to get_llm_client by FastAPI when injected.
     try:
-        return await process_multiple_prompts(
-            llm_client, prompt_request, batch_size=100
+        response = await process_multiple_prompts(
+            llm_client, prompt_request, background_tasks=background_tasks
         )
+        return to_json_response(response)
     except Exception as e:
-        logger.error(f"Error processing /prompts: {str(e)}")
+        logger.error("Error processing /prompts: %s", e)
         # Consider if MultiplePromptsResponse should have a global error field
         # For now, returning a 500 might be one way, or a structured error response.
         # This example re-raises, letting FastAPI handle it, or you could return a custom error response.
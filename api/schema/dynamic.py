@@ -1,19 +1,136 @@
 """Dynamic schema creation utilities."""
 
+import hashlib
+import json
 import logging
-from typing import Any, Dict, List, Literal
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type
 
-from pydantic import Field, create_model
+from pydantic import BaseModel, Field, create_model
+
+from ..models import PromptRequest
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Maximum number of distinct dynamic models kept in memory
+MODEL_CACHE_SIZE = 256
+
+# Canonical schema key -> built model, in least-recently-used order
+_MODEL_CACHE: "OrderedDict[str, Type[BaseModel]]" = OrderedDict()
+
+
+def get_trivial_field(
+    schema_obj: Dict[str, Any], extract_field_path: Optional[str]
+) -> Optional[str]:
+    """
+    Detect a schema that only wraps a single plain string field being extracted.
+
+    Such requests don't need a dynamic model: the raw LLM text is the field value.
+    Non-string scalars are excluded since free text would need coercion.
+
+    Args:
+        schema_obj: JSON schema object defining the model
+        extract_field_path: Path to the field to extract (optional)
+
+    Returns:
+        The field name if the schema is trivial for this extraction, otherwise None
+    """
+    properties = schema_obj.get("properties", {})
+    if not extract_field_path or len(properties) != 1:
+        return None
+
+    field_schema = properties.get(extract_field_path)
+    if (
+        not isinstance(field_schema, dict)
+        or field_schema.get("type") != "string"
+        or "enum" in field_schema
+    ):
+        return None
+
+    return extract_field_path
+
+
+def build_trivial_field_prompt(
+    prompt: str, field_name: str, schema_obj: Dict[str, Any]
+) -> str:
+    """
+    Wrap a prompt so the LLM answers with just the value of a trivial field.
+
+    Args:
+        prompt: The user prompt
+        field_name: The single field returned by get_trivial_field
+        schema_obj: JSON schema object containing the field
+
+    Returns:
+        The prompt with a short plain-text answer instruction appended
+    """
+    description = schema_obj["properties"][field_name].get("description")
+    hint = f" ({description})" if description else ""
+    return (
+        f"{prompt}\n\nRespond with only the value for '{field_name}'{hint} "
+        "as plain text."
+    )
+
+
+@lru_cache(maxsize=1024)
+def _enum_literal(values: Tuple[Any, ...]) -> Any:
+    """Build the Literal type for a set of enum values, once per distinct set."""
+    return Literal[values]
+
+
+def _enum_field(enum_values: List[Any]) -> Any:
+    """Map JSON schema enum values to a Literal type."""
+    values = tuple(enum_values)
+    try:
+        return _enum_literal(values)
+    except TypeError:
+        # Unhashable enum values can't be cached
+        return Literal[values]
+
+
+# JSON schema type -> Python type, unknown types default to Any.
+# Nested objects could be handled recursively, but for simplicity we use dict
+# and treat arrays as list of Any.
+_JSON_TO_PY: Dict[str, Any] = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "array": List[Any],
+    "object": Dict[str, Any],
+}
+
+
+def _schema_cache_key(schema_name: str, schema_obj: Dict[str, Any]) -> str:
+    """
+    Build a canonical cache key for a schema, independent of key ordering.
+
+    Property order is kept, as it sets the order of the model's fields and so
+    of the structured output; every other key is sorted. The key is a SHA-256
+    digest so the cache doesn't hold on to full schema strings. Descriptions
+    stay part of the key since Instructor forwards them to the LLM.
+    """
+    rest = {key: value for key, value in schema_obj.items() if key != "properties"}
+    properties = list(schema_obj.get("properties", {}).items())
+    canonical = json.dumps(
+        [schema_name, rest, properties],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
 
 def create_dynamic_model_from_schema(schema_name: str, schema_obj: Dict[str, Any]):
     """
     Create a Pydantic model from a JSON schema, properly handling constraints like
     enums.
 
+    Models are cached per canonical schema, so repeated requests with the same
+    schema reuse the already-built class.
+
     Args:
         schema_name: Name for the dynamic model
         schema_obj: JSON schema object defining the model
@@ -21,62 +138,149 @@ def create_dynamic_model_from_schema(schema_name: str, schema_obj: Dict[str, Any
     Returns:
         A dynamically created Pydantic model class
     """
+    cache_key = _schema_cache_key(schema_name, schema_obj)
+    cached_model = _MODEL_CACHE.get(cache_key)
+    if cached_model is not None:
+        _MODEL_CACHE.move_to_end(cache_key)
+        return cached_model
+
+    model = _build_dynamic_model(schema_name, schema_obj)
+    _MODEL_CACHE[cache_key] = model
+    if len(_MODEL_CACHE) > MODEL_CACHE_SIZE:
+        _MODEL_CACHE.popitem(last=False)
+    return model
+
+
+def _build_dynamic_model(
+    schema_name: str, schema_obj: Dict[str, Any]
+) -> Type[BaseModel]:
+    """Build a new Pydantic model class for a JSON schema."""
     properties = schema_obj.get("properties", {})
     model_fields = {}
 
     for field_name, field_schema in properties.items():
         field_type = field_schema.get("type")
-        description = field_schema.get("description", "")
-
-        # Handle different schema types
-        if field_type == "string":
-            # Check for enum constraint
-            if "enum" in field_schema:
-                # Create a Literal type with the enum values
-                enum_values = field_schema["enum"]
-                # Use typing.Literal for enum constraints
-                field_type = Literal[tuple(enum_values)]
-                model_fields[field_name] = (
-                    field_type,
-                    Field(..., description=description),
-                )
-            else:
-                model_fields[field_name] = (str, Field(..., description=description))
-
-        elif field_type == "integer":
-            # Ensure integers are properly enforced
-            def validate_int(cls, v):
-                if isinstance(v, float):
-                    # Convert float to int if it's a whole number
-                    if v.is_integer():
-                        return int(v)
-                return v
-
-            # Add validator for integer conversion
-            model_fields[field_name] = (int, Field(..., description=description))
-
-        elif field_type == "number":
-            model_fields[field_name] = (float, Field(..., description=description))
-
-        elif field_type == "boolean":
-            model_fields[field_name] = (bool, Field(..., description=description))
-
-        elif field_type == "array":
-            # For simplicity, treat arrays as list of Any
-            model_fields[field_name] = (List[Any], Field(..., description=description))
-
-        elif field_type == "object":
-            # Nested objects could be handled recursively,
-            # but for simplicity we use dict
-            model_fields[field_name] = (
-                Dict[str, Any],
-                Field(..., description=description),
-            )
-
+        if field_type == "string" and "enum" in field_schema:
+            # Use typing.Literal for enum constraints
+            py_type = _enum_field(field_schema["enum"])
+        elif isinstance(field_type, str):
+            py_type = _JSON_TO_PY.get(field_type, Any)
         else:
-            # Default to Any for unknown types
-            model_fields[field_name] = (Any, Field(..., description=description))
+            # Union types like ["string", "null"] are unhashable; treat them as Any
+            py_type = Any
+        model_fields[field_name] = (
+            py_type,
+            Field(..., description=field_schema.get("description", "")),
+        )
 
     # Create the dynamic model
-    logger.info(f"Created dynamic schema: {schema_name}")
+    logger.info("Created dynamic schema: %s", schema_name)
     return create_model(schema_name, **model_fields)
+
+
+def _json_schema_envelope(
+    response_format: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the "json_schema" envelope of a response_format.
+
+    Args:
+        response_format: The response_format of a prompt request
+
+    Returns:
+        The envelope (empty if missing), or None if the format isn't json_schema
+
+    Raises:
+        ValueError: If the envelope isn't an object
+    """
+    if not response_format or response_format.get("type") != "json_schema":
+        return None
+    envelope = response_format.get("json_schema") or {}
+    if not isinstance(envelope, dict):
+        raise ValueError("json_schema must be an object")
+    return envelope
+
+
+def _check_schema_shape(schema_obj: Any) -> None:
+    """
+    Reject a JSON-valid schema whose structure can't describe a model.
+
+    Args:
+        schema_obj: The "schema" of a json_schema response_format
+
+    Raises:
+        ValueError: If the schema, its properties or a property isn't an object
+    """
+    if not isinstance(schema_obj, dict):
+        raise ValueError("schema must be an object")
+
+    properties = schema_obj.get("properties", {})
+    if not isinstance(properties, dict):
+        raise ValueError("schema properties must be an object")
+
+    for field_name, field_schema in properties.items():
+        if not isinstance(field_schema, dict):
+            raise ValueError(f"schema of property '{field_name}' must be an object")
+
+
+def get_request_trivial_field(prompt_request: PromptRequest) -> Optional[str]:
+    """
+    Return the extracted field name if the request uses a trivial schema.
+
+    Args:
+        prompt_request: The prompt request to inspect
+
+    Returns:
+        The single string field being extracted, or None
+    """
+    envelope = _json_schema_envelope(prompt_request.response_format)
+    if not envelope or "schema" not in envelope:
+        return None
+
+    return get_trivial_field(envelope["schema"], prompt_request.extract_field_path)
+
+
+def resolve_schema_for(
+    prompt_request: PromptRequest,
+) -> Tuple[str, Optional[Type[BaseModel]], bool]:
+    """
+    Resolve the prompt text and response model for a prompt request.
+
+    Args:
+        prompt_request: The prompt request to resolve
+
+    Returns:
+        Tuple containing:
+        - The prompt text
+        - Response model (if schema provided)
+        - Boolean indicating if the request has a schema
+
+    Raises:
+        ValueError: If the response schema is malformed
+    """
+    prompt = prompt_request.prompt
+    response_model = None
+    has_schema = False
+
+    # Check if we need a structured schema
+    envelope = _json_schema_envelope(prompt_request.response_format)
+    if envelope is not None:
+        has_schema = True
+        if "schema" in envelope:
+            schema_name = envelope.get("name", "DynamicSchema")
+            schema_obj = envelope["schema"]
+            _check_schema_shape(schema_obj)
+
+            trivial_field = get_trivial_field(
+                schema_obj, prompt_request.extract_field_path
+            )
+            if trivial_field:
+                # Single string field: ask for the raw value, skip the model
+                prompt = build_trivial_field_prompt(prompt, trivial_field, schema_obj)
+            else:
+                # Create a model with proper enum handling
+                response_model = create_dynamic_model_from_schema(
+                    schema_name, schema_obj
+                )
+
+    return prompt, response_model, has_schema
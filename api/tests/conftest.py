@@ -1,99 +1,85 @@
 """Shared fixtures for API tests."""
 
 import os
-from typing import AsyncGenerator, Dict, Generator
+from typing import Any, AsyncGenerator, Dict, Generator
 
 import httpx
 import instructor
+import logfire
 import pytest
 from asgi_lifespan import LifespanManager
+from fastapi.testclient import TestClient
 from openai import AsyncOpenAI
 
 from api.main import app
 
-print(f"Conftest: Imported 'app', type is: {type(app)}")
 
+@pytest.fixture(scope="session")
+def client() -> Generator[TestClient, None, None]:
+    """Provide one TestClient for the whole session, running the lifespan once."""
+    # The lifespan reads OPENROUTER_API_KEY at startup, before the
+    # function-scoped setup_test_environment fixture runs
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("HUMBLE_CLAY_API_KEY", "test_api_key")
+        if "OPENROUTER_API_KEY" not in os.environ:
+            monkeypatch.setenv("OPENROUTER_API_KEY", "dummy_openrouter_key_for_tests")
+        with TestClient(app) as test_client:
+            yield test_client
 
-@pytest.fixture(scope="function")
-async def client() -> AsyncGenerator[httpx.AsyncClient, None]:
-    print("Conftest (fixture): STARTING client fixture")
-    try:
-        print(
-            "Conftest (fixture): Entering LifespanManager context (without 'as manager')..."
-        )
-        # Enter the context manager to run startup events on 'app'
-        async with LifespanManager(app):
-            print(
-                "Conftest (fixture): LifespanManager context ENTERED. Startup should have run on 'app'."
-            )
-
-            # Use the original 'app' instance, which should now have its state modified by lifespan startup
-            transport = httpx.ASGITransport(app=app)
-            print("Conftest (fixture): ASGITransport created using original 'app'.")
-
-            async with httpx.AsyncClient(
-                transport=transport, base_url="http://testserver"
-            ) as ac:
-                print(
-                    "Conftest (fixture): httpx.AsyncClient context ENTERED. Yielding client."
-                )
-                yield ac
-                print("Conftest (fixture): httpx.AsyncClient context EXITED.")
-        print(
-            "Conftest (fixture): LifespanManager context EXITED. Shutdown should have run on 'app'."
-        )
-    except Exception as e:
-        print(
-            f"Conftest (fixture): EXCEPTION during client fixture setup/teardown: {e}"
-        )
-        raise  # Re-raise the exception to fail the test clearly
-    print("Conftest (fixture): FINISHED client fixture")
+
+@pytest.fixture
+async def async_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Provide an async client running the app lifespan on the test's loop."""
+    async with LifespanManager(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as ac:
+            yield ac
+
+
+@pytest.fixture(scope="session", autouse=True)
+def configure_logfire() -> None:
+    """Configure Logfire once per session, without exporting or printing spans."""
+    # Overrides the configuration api.main applies at import time
+    logfire.configure(
+        service_name="humble-clay-api-test",
+        service_version="0.1.0",
+        environment="testing",
+        send_to_logfire=False,
+        console=False,
+    )
 
 
 @pytest.fixture(autouse=True)
-def setup_test_environment() -> Generator[None, None, None]:
+def setup_test_environment(monkeypatch: pytest.MonkeyPatch) -> None:
     """Set up the test environment for API key validation."""
-    # Save original environment variable values
-    original_humble_clay_api_key = os.environ.get("HUMBLE_CLAY_API_KEY")
-    original_openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-
-    # Set test API keys for all tests
     # HUMBLE_CLAY_API_KEY is used for endpoint authentication
-    os.environ["HUMBLE_CLAY_API_KEY"] = "test_api_key"
+    monkeypatch.setenv("HUMBLE_CLAY_API_KEY", "test_api_key")
     # OPENROUTER_API_KEY is used by the lifespan function to initialize the LLM client
-    # For @pytest.mark.llm tests, this should be a real key.
-    # For other tests, it can be a dummy key if the client init is mocked or expected to fail gracefully.
-    # Ensure a value is set to avoid the "not found" warning path in lifespan if not already set.
+    # For @pytest.mark.llm tests, this should be a real key; other tests get a
+    # placeholder so the lifespan doesn't take the "not found" path.
     if "OPENROUTER_API_KEY" not in os.environ:
-        print(
-            "Conftest: OPENROUTER_API_KEY not found in env, setting a placeholder for non-LLM tests."
-        )
-        os.environ["OPENROUTER_API_KEY"] = (
-            "dummy_openrouter_key_for_tests"  # Placeholder
-        )
+        monkeypatch.setenv("OPENROUTER_API_KEY", "dummy_openrouter_key_for_tests")
 
-    yield
 
-    # Restore original environment
-    if original_humble_clay_api_key:
-        os.environ["HUMBLE_CLAY_API_KEY"] = original_humble_clay_api_key
-    else:
-        os.environ.pop("HUMBLE_CLAY_API_KEY", None)
-
-    if original_openrouter_api_key:
-        os.environ["OPENROUTER_API_KEY"] = original_openrouter_api_key
-    else:
-        os.environ.pop("OPENROUTER_API_KEY", None)
+@pytest.fixture
+def mocked_llm(mocker: Any) -> Any:
+    """Patch the LLM call used by the prompt endpoints; tests configure it."""
+    return mocker.patch("api.batch.processor.process_with_llm")
 
 
-@pytest.fixture
+# The fixtures below are built once per session; tests must treat them as
+# read-only. They stay plain dicts because the schemas are embedded in JSON
+# payloads, which json.dumps cannot do for a MappingProxyType.
+@pytest.fixture(scope="session")
 def auth_headers() -> Dict[str, str]:
     """Provide authentication headers for API requests."""
     # Use the same test API key that was set in setup_test_environment
     return {"X-API-Key": "test_api_key"}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def nested_schema() -> dict:
     """Provides a sample nested JSON schema for testing field extraction."""
     return {
@@ -122,7 +108,7 @@ def nested_schema() -> dict:
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_schema() -> dict:
     """Provides a simple JSON schema for testing."""
     return {
@@ -4,37 +4,39 @@ import asyncio
 import time
 from typing import Any, Dict
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
+from fastapi import BackgroundTasks
 
 from api.batch.processor import (
-    prepare_prompt_request,
+    MAX_LOGGED_ITEM_ERRORS,
     process_multiple_prompts,
+    resolve_batch_schemas,
+    stream_multiple_prompts,
 )
 from api.models import MultiplePromptsRequest, PromptRequest
+from api.schema.dynamic import resolve_schema_for
 
 
-@pytest.mark.asyncio
-async def test_prepare_prompt_request_standard():
-    """Test preparation of a standard prompt request without schema."""
+def test_resolve_schema_for_standard():
+    """Test resolving a standard prompt request without schema."""
     prompt_request = PromptRequest(prompt="Test prompt")
 
-    prompt, response_model, has_schema = await prepare_prompt_request(prompt_request)
+    prompt, response_model, has_schema = resolve_schema_for(prompt_request)
 
     assert prompt == "Test prompt"
     assert response_model is None
     assert has_schema is False
 
 
-@pytest.mark.asyncio
-async def test_prepare_prompt_request_with_schema(sample_schema: dict):
-    """Test preparation of a prompt request with JSON schema."""
+def test_resolve_schema_for_with_schema(sample_schema: dict):
+    """Test resolving a prompt request with JSON schema."""
     prompt_request = PromptRequest(
         prompt="Test prompt with schema",
         response_format={"type": "json_schema", "json_schema": sample_schema},
     )
 
-    prompt, response_model, has_schema = await prepare_prompt_request(prompt_request)
+    prompt, response_model, has_schema = resolve_schema_for(prompt_request)
 
     assert prompt == "Test prompt with schema"
     assert response_model is not None
@@ -43,6 +45,65 @@ async def test_prepare_prompt_request_with_schema(sample_schema: dict):
     assert "output" in response_model.__annotations__
 
 
+def test_resolve_schema_for_trivial_schema(sample_schema: dict):
+    """Test that extracting the only string field of a schema skips the model."""
+    prompt_request = PromptRequest(
+        prompt="Test prompt with schema",
+        response_format={"type": "json_schema", "json_schema": sample_schema},
+        extract_field_path="output",
+    )
+
+    prompt, response_model, has_schema = resolve_schema_for(prompt_request)
+
+    assert prompt.startswith("Test prompt with schema")
+    assert "'output'" in prompt
+    assert response_model is None
+    assert has_schema is True
+
+
+def test_resolve_batch_schemas_shared_schema(sample_schema: dict):
+    """Test that a schema shared by the whole batch is resolved only once."""
+    response_format = {"type": "json_schema", "json_schema": sample_schema}
+    prompts = [
+        PromptRequest(prompt=f"Prompt {i}", response_format=response_format)
+        for i in range(3)
+    ]
+
+    resolved = resolve_batch_schemas(prompts)
+
+    assert [prompt for prompt, _, _ in resolved] == ["Prompt 0", "Prompt 1", "Prompt 2"]
+    assert resolved[0][1] is not None
+    assert all(model is resolved[0][1] for _, model, _ in resolved)
+    assert all(has_schema for _, _, has_schema in resolved)
+
+
+def test_resolve_batch_schemas_mixed_formats(sample_schema: dict):
+    """Test that each distinct response format of a batch is resolved once."""
+    response_format = {"type": "json_schema", "json_schema": sample_schema}
+    prompts = [
+        PromptRequest(prompt="Prompt 0", response_format=response_format),
+        PromptRequest(prompt="Prompt 1"),
+        PromptRequest(prompt="Prompt 2", response_format=response_format),
+    ]
+
+    resolved = resolve_batch_schemas(prompts)
+
+    assert resolved[1] == ("Prompt 1", None, False)
+    assert resolved[0][1] is not None
+    assert resolved[2][1] is resolved[0][1]
+
+
+def test_resolve_batch_schemas_invalid_schema():
+    """Test that an invalid schema is left for each item to report."""
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": "Bad", "schema": {"properties": []}},
+    }
+    prompts = [PromptRequest(prompt="Prompt 0", response_format=response_format)]
+
+    assert resolve_batch_schemas(prompts) == [None]
+
+
 @pytest.mark.asyncio
 async def test_concurrent_processing_maintains_order(mocker: Any):
     """Test that concurrent processing maintains the order of responses."""
@@ -50,7 +111,7 @@ async def test_concurrent_processing_maintains_order(mocker: Any):
     mock_process = mocker.patch("api.batch.processor.process_with_llm")
 
     # Simulate varying response times that would change order if not handled correctly
-    async def delayed_response(prompt, response_model=None, model=None):
+    async def delayed_response(llm_client, prompt, response_model=None, model=None):
         # Make later requests finish first
         delay = (
             0.2 - int(prompt.split()[-1]) * 0.02
@@ -65,7 +126,7 @@ async def test_concurrent_processing_maintains_order(mocker: Any):
     request = MultiplePromptsRequest(prompts=prompts)
 
     # Process the request
-    response = await process_multiple_prompts(request, batch_size=10)
+    response = await process_multiple_prompts(None, request, max_concurrency=10)
 
     # Verify that responses maintain the original order
     assert len(response.responses) == 10
@@ -79,7 +140,7 @@ async def test_concurrent_error_handling(mocker: Any):
     # Mock process_with_llm to simulate errors for specific prompts
     mock_process = mocker.patch("api.batch.processor.process_with_llm")
 
-    async def mock_response(prompt, response_model=None, model=None):
+    async def mock_response(llm_client, prompt, response_model=None, model=None):
         await asyncio.sleep(0.05)  # Small delay
         # Fail for specific prompts
         if prompt in ["Prompt 2", "Prompt 7"]:
@@ -93,7 +154,7 @@ async def test_concurrent_error_handling(mocker: Any):
     request = MultiplePromptsRequest(prompts=prompts)
 
     # Process the request
-    response = await process_multiple_prompts(request, batch_size=10)
+    response = await process_multiple_prompts(None, request, max_concurrency=10)
 
     # Verify that errors are handled correctly
     assert len(response.responses) == 10
@@ -108,6 +169,173 @@ async def test_concurrent_error_handling(mocker: Any):
             assert response.responses[i].response == f"Success: Prompt {i}"
 
 
+@pytest.mark.asyncio
+async def test_item_errors_are_sampled_and_counted(mocker: Any):
+    """Test that only a sample of item errors is logged, all are counted."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+    mock_process.side_effect = Exception("LLM unavailable")
+    mock_log_error = mocker.patch("api.batch.processor.log_batch_item_error")
+    mock_log_summary = mocker.patch("api.batch.processor.log_batch_summary")
+
+    prompts = [PromptRequest(prompt=f"Prompt {i}") for i in range(20)]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    result = await process_multiple_prompts(None, request, max_concurrency=5)
+
+    assert all(r.status == "error" for r in result.responses)
+    assert mock_log_error.call_count == MAX_LOGGED_ITEM_ERRORS
+    assert mock_log_summary.call_args[0][-1] == {"processing": 20}
+
+
+@pytest.mark.asyncio
+async def test_shared_failure_counts_once_per_llm_call(mocker: Any):
+    """Test that identical failing prompts are failed per prompt, counted once."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+    mock_process.side_effect = Exception("LLM unavailable")
+    mock_log_summary = mocker.patch("api.batch.processor.log_batch_summary")
+
+    prompts = [PromptRequest(prompt="Same prompt") for _ in range(10)]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    await process_multiple_prompts(None, request)
+
+    _, completed, failed, *_, error_counts = mock_log_summary.call_args[0]
+    assert (completed, failed) == (0, 10)
+    assert error_counts == {"processing": 1}
+
+
+@pytest.mark.asyncio
+async def test_item_error_duration_excludes_queueing(mocker: Any):
+    """Test that a failed item's logged duration starts when it gets a slot."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+
+    async def slow_then_fail(llm_client, prompt, response_model=None, model=None):
+        if prompt == "Slow prompt":
+            await asyncio.sleep(0.2)
+            return "Done"
+        raise Exception("LLM unavailable")
+
+    mock_process.side_effect = slow_then_fail
+    mock_log_error = mocker.patch("api.batch.processor.log_batch_item_error")
+    mocker.patch("api.batch.processor.log_batch_summary")
+
+    # With one slot, the failing prompt waits for the longer, slow one
+    prompts = [PromptRequest(prompt="Fail"), PromptRequest(prompt="Slow prompt")]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    await process_multiple_prompts(None, request, max_concurrency=1)
+
+    item_duration = mock_log_error.call_args[0][2]
+    assert item_duration < 0.1
+
+
+@pytest.mark.asyncio
+async def test_stream_multiple_prompts_yields_in_completion_order(mocker: Any):
+    """Test that streamed responses arrive as they complete, with their index."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+
+    async def delayed_response(llm_client, prompt, response_model=None, model=None):
+        # Later prompts finish first
+        await asyncio.sleep(0.1 - int(prompt.split()[-1]) * 0.03)
+        return f"Response: {prompt}"
+
+    mock_process.side_effect = delayed_response
+
+    prompts = [PromptRequest(prompt=f"Prompt {i}") for i in range(3)]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    results = [
+        (index, response.response)
+        async for index, response in stream_multiple_prompts(None, request)
+    ]
+
+    assert results == [
+        (2, "Response: Prompt 2"),
+        (1, "Response: Prompt 1"),
+        (0, "Response: Prompt 0"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_identical_prompts_share_one_llm_call(mocker: Any):
+    """Test that identical prompts in a batch are sent to the LLM only once."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+    mock_process.side_effect = ["Response A", "Response B"]
+
+    prompts = [
+        PromptRequest(prompt="Prompt A"),
+        PromptRequest(prompt="Prompt B"),
+        PromptRequest(prompt="Prompt A"),
+    ]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    result = await process_multiple_prompts(None, request)
+
+    assert mock_process.call_count == 2
+    assert [r.response for r in result.responses] == [
+        "Response A",
+        "Response B",
+        "Response A",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_longest_prompts_are_dispatched_first(mocker: Any):
+    """Test that prompts start longest first while responses keep input order."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+
+    async def echo(llm_client, prompt, response_model=None, model=None):
+        return prompt
+
+    mock_process.side_effect = echo
+
+    prompts = [PromptRequest(prompt=p) for p in ["a", "ccc", "bb"]]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    result = await process_multiple_prompts(None, request, max_concurrency=1)
+
+    dispatched = [call.args[1] for call in mock_process.call_args_list]
+    assert dispatched == ["ccc", "bb", "a"]
+    assert [r.response for r in result.responses] == ["a", "ccc", "bb"]
+
+
+@pytest.mark.asyncio
+async def test_extraction_without_schema_skips_llm_call(mocker: Any):
+    """Test that a field extraction that can't succeed never calls the LLM."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+
+    prompts = [PromptRequest(prompt="Prompt 0", extract_field_path="some.field")]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    result = await process_multiple_prompts(None, request)
+
+    assert not mock_process.called
+    assert result.responses[0].status == "error"
+    assert result.responses[0].error == "Field extraction requires a schema"
+
+
+@pytest.mark.asyncio
+async def test_trivial_field_strips_raw_text(mocker: Any, sample_schema: dict):
+    """Test that the raw text answering a trivial single-field schema is stripped."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+    mock_process.return_value = "  Paris\n"
+
+    prompts = [
+        PromptRequest(
+            prompt="Capital of France?",
+            response_format={"type": "json_schema", "json_schema": sample_schema},
+            extract_field_path="output",
+        )
+    ]
+    request = MultiplePromptsRequest(prompts=prompts)
+
+    result = await process_multiple_prompts(None, request)
+
+    assert mock_process.call_args.kwargs["response_model"] is None
+    assert result.responses[0].status == "success"
+    assert result.responses[0].response == "Paris"
+
+
 @pytest.mark.asyncio
 async def test_first_result_time_tracking(mocker: Any):
     """Test that first result time is tracked correctly."""
@@ -117,7 +345,7 @@ async def test_first_result_time_tracking(mocker: Any):
     # Mock the log_batch_summary function from the right import path
     mock_log_summary = mocker.patch("api.batch.processor.log_batch_summary")
 
-    async def delayed_response(prompt, response_model=None, model=None):
+    async def delayed_response(llm_client, prompt, response_model=None, model=None):
         # Make the third prompt finish first
         idx = int(prompt.split()[-1])
         if idx == 2:
@@ -133,7 +361,7 @@ async def test_first_result_time_tracking(mocker: Any):
     request = MultiplePromptsRequest(prompts=prompts)
 
     # Process the request
-    await process_multiple_prompts(request, batch_size=5)
+    await process_multiple_prompts(None, request, max_concurrency=5)
 
     # Verify log_batch_summary was called (this captures first_result_time)
     assert mock_log_summary.called
@@ -146,12 +374,28 @@ async def test_first_result_time_tracking(mocker: Any):
     )  # Should have at least 4 parameters (total prompts, completed, failed, duration)
 
 
+@pytest.mark.asyncio
+async def test_batch_summary_deferred_to_background_tasks(mocker: Any):
+    """Test that the batch summary is logged by a background task when given."""
+    mock_process = mocker.patch("api.batch.processor.process_with_llm")
+    mock_process.return_value = "Response"
+    mock_log_summary = mocker.patch("api.batch.processor.log_batch_summary")
+    background_tasks = BackgroundTasks()
+
+    request = MultiplePromptsRequest(prompts=[PromptRequest(prompt="Prompt 0")])
+    await process_multiple_prompts(None, request, background_tasks=background_tasks)
+
+    assert not mock_log_summary.called
+    await background_tasks()
+    assert mock_log_summary.call_args[0][:3] == (1, 1, 0)
+
+
 @pytest.mark.asyncio
 async def test_batch_processing_with_large_input(mocker: Any):
     """Test processing a large number of prompts in multiple batches."""
     mock_process = mocker.patch("api.batch.processor.process_with_llm")
 
-    async def mock_response(prompt, response_model=None, model=None):
+    async def mock_response(llm_client, prompt, response_model=None, model=None):
         # Add small delay to simulate real processing
         await asyncio.sleep(0.01)
         return f"Response for {prompt}"
@@ -160,12 +404,14 @@ async def test_batch_processing_with_large_input(mocker: Any):
 
     # Create a large number of prompts
     num_prompts = 25
-    batch_size = 10
+    max_concurrency = 10
     prompts = [PromptRequest(prompt=f"Prompt {i}") for i in range(num_prompts)]
     request = MultiplePromptsRequest(prompts=prompts)
 
     # Process the request
-    response = await process_multiple_prompts(request, batch_size=batch_size)
+    response = await process_multiple_prompts(
+        None, request, max_concurrency=max_concurrency
+    )
 
     # Verify results
     assert len(response.responses) == num_prompts
@@ -179,14 +425,14 @@ async def test_batch_processing_with_large_input(mocker: Any):
     assert mock_process.call_count == num_prompts
 
 
-@pytest.mark.parametrize("batch_size", [1, 3, 5, 10])
+@pytest.mark.parametrize("max_concurrency", [1, 3, 5, 10])
 @pytest.mark.asyncio
-async def test_different_batch_sizes(mocker: Any, batch_size: int):
-    """Test processing with different batch sizes (which controls concurrency)."""
+async def test_different_concurrency_limits(mocker: Any, max_concurrency: int):
+    """Test processing with different concurrency limits."""
     # Mock functions
     mock_process = mocker.patch("api.batch.processor.process_with_llm")
 
-    async def mock_response(prompt, response_model=None, model=None):
+    async def mock_response(llm_client, prompt, response_model=None, model=None):
         await asyncio.sleep(0.05)
         return f"Response for {prompt}"
 
@@ -199,7 +445,9 @@ async def test_different_batch_sizes(mocker: Any, batch_size: int):
 
     # Measure execution time
     start_time = time.time()
-    response = await process_multiple_prompts(request, batch_size=batch_size)
+    response = await process_multiple_prompts(
+        None, request, max_concurrency=max_concurrency
+    )
     end_time = time.time()
 
     # Verify results
@@ -208,26 +456,25 @@ async def test_different_batch_sizes(mocker: Any, batch_size: int):
     # Verify all responses are successful
     assert all(r.status == "success" for r in response.responses)
 
-    # Calculate expected batches
-    expected_batches = (num_prompts + batch_size - 1) // batch_size
-    # Each batch is processed concurrently, so time should be roughly:
-    # total_batches * 0.05 seconds
-    expected_time = expected_batches * 0.05
+    # With equal-length calls, at most max_concurrency run at a time, so the
+    # total time should be roughly: ceil(num_prompts / max_concurrency) * 0.05
+    expected_waves = (num_prompts + max_concurrency - 1) // max_concurrency
+    expected_time = expected_waves * 0.05
 
-    # This is just a rough check to make sure concurrency is working within batches
-    # but sequential between batches
+    # This is just a rough check that the limit is respected but still concurrent
     assert end_time - start_time >= expected_time * 0.9, (
-        "Batches not processed sequentially"
+        "Concurrency limit not respected"
     )
-    assert end_time - start_time <= expected_time * 2, "Batch concurrency not effective"
+    assert end_time - start_time <= expected_time * 2, "Concurrency not effective"
 
 
 # Integration Tests
 
 
 @pytest.mark.llm
-def test_concurrent_processing_endpoint(
-    client: TestClient, auth_headers: Dict[str, str]
+@pytest.mark.asyncio
+async def test_concurrent_processing_endpoint(
+    async_client: httpx.AsyncClient, auth_headers: Dict[str, str]
 ):
     """Test the endpoint with concurrent processing enabled."""
     # Create a reasonable number of prompts for real testing
@@ -236,7 +483,7 @@ def test_concurrent_processing_endpoint(
         for i in range(5)
     ]
 
-    response = client.post(
+    response = await async_client.post(
         "/api/v1/prompts", json={"prompts": prompts}, headers=auth_headers
     )
 
@@ -253,14 +500,15 @@ def test_concurrent_processing_endpoint(
 
 
 @pytest.mark.llm
-def test_concurrent_processing_with_errors(
-    client: TestClient, auth_headers: Dict[str, str], mocker: Any
+@pytest.mark.asyncio
+async def test_concurrent_processing_with_errors(
+    async_client: httpx.AsyncClient, auth_headers: Dict[str, str], mocker: Any
 ):
     """Test concurrent processing with some expected LLM errors."""
     # Mock LLM to control the behavior consistently
     mock_process = mocker.patch("api.batch.processor.process_with_llm")
 
-    async def mock_llm_response(prompt, response_model=None, model=None):
+    async def mock_llm_response(llm_client, prompt, response_model=None, model=None):
         # Simulate LLM calls with consistent behavior
         if "empty" in prompt.lower():
             return ""
@@ -281,7 +529,7 @@ def test_concurrent_processing_with_errors(
         {"prompt": "Generate JSON", "extract_field_path": "field.that.does.not.exist"},
     ]
 
-    response = client.post(
+    response = await async_client.post(
         "/api/v1/prompts", json={"prompts": prompts}, headers=auth_headers
     )
 
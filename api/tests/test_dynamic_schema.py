@@ -0,0 +1,58 @@
+"""Tests for dynamic schema model creation."""
+
+from api.schema.dynamic import create_dynamic_model_from_schema
+
+
+def test_dynamic_model_is_cached_per_schema():
+    """Test that the same schema reuses the already-built model class."""
+    schema = {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "age": {"type": "integer"}},
+    }
+    reordered_keys = {
+        "properties": {"name": {"type": "string"}, "age": {"type": "integer"}},
+        "type": "object",
+    }
+    reordered_properties = {
+        "type": "object",
+        "properties": {"age": {"type": "integer"}, "name": {"type": "string"}},
+    }
+
+    first = create_dynamic_model_from_schema("CachedSchema", schema)
+
+    assert create_dynamic_model_from_schema("CachedSchema", schema) is first
+    assert create_dynamic_model_from_schema("CachedSchema", reordered_keys) is first
+
+    # Property order is the field order of the structured output
+    other = create_dynamic_model_from_schema("CachedSchema", reordered_properties)
+    assert other is not first
+    assert list(other.model_fields) == ["age", "name"]
+
+
+def test_dynamic_model_cache_keeps_descriptions_distinct():
+    """Test that schemas differing in descriptions get separate models."""
+    schema = {"properties": {"name": {"type": "string", "description": "Full"}}}
+    other = {"properties": {"name": {"type": "string", "description": "First"}}}
+
+    first = create_dynamic_model_from_schema("DescribedSchema", schema)
+    second = create_dynamic_model_from_schema("DescribedSchema", other)
+
+    assert first is not second
+    assert second.model_fields["name"].description == "First"
+
+
+def test_enum_literal_is_reused_across_schemas():
+    """Test that identical enum values share one Literal type."""
+    first = create_dynamic_model_from_schema(
+        "FirstEnum",
+        {"properties": {"status": {"type": "string", "enum": ["on", "off"]}}},
+    )
+    second = create_dynamic_model_from_schema(
+        "SecondEnum",
+        {"properties": {"state": {"type": "string", "enum": ["on", "off"]}}},
+    )
+
+    assert (
+        first.model_fields["status"].annotation
+        is second.model_fields["state"].annotation
+    )
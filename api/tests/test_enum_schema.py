@@ -1,150 +1,113 @@
 """Tests for enum schema handling in the API."""
 
 import logging
+from typing import Dict, Generator
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
-import api.main  # Import main to allow mocking its members
-from api.main import app  # Import app directly for dependency overrides
-from api.models import MultiplePromptsRequest, PromptRequest
-
 logger = logging.getLogger(__name__)
 
-# Use TestClient with the app instance
-client = TestClient(app)
+ENUM_VALUES = ("active", "pending", "completed")
+
+# Single-prompt cases: (id, prompt, status value the mocked LLM answers with)
+SINGLE_PROMPT_CASES = [
+    ("simple_value", "The project status is active", "active"),
+    (
+        "clear_match",
+        "We're waiting for client approval. The status is pending.",
+        "pending",
+    ),
+    # Simulate LLM correctly inferring from context
+    ("inference_required", "The task has been completed as of yesterday.", "completed"),
+    # "in progress, but nearly done" maps to "pending"
+    (
+        "similar_but_different",
+        "This project is in progress, but nearly done.",
+        "pending",
+    ),
+    # "on hold" should map to "pending"
+    ("on_hold_case", "Work is on hold until further notice.", "pending"),
+]
+
+BATCH_CASES = [
+    ("The project status is active and progressing well", "active"),
+    ("We're waiting for client approval. The status is pending", "pending"),
+    ("The task has been completed as of yesterday", "completed"),
+]
+
+# Prompt -> status value, derived from the case tables so they can't drift
+MOCK_STATUSES = {
+    **{prompt: expected for _, prompt, expected in SINGLE_PROMPT_CASES},
+    **dict(BATCH_CASES),
+}
+
+
+async def mock_process_with_llm(llm_client, prompt, response_model=None, model=None):
+    """Mock process_with_llm answering each prompt from MOCK_STATUSES."""
+    if response_model:
+        # If the value isn't in the enum, the dynamic model raises a
+        # ValidationError, just as Instructor would for the real LLM
+        return response_model(status=MOCK_STATUSES.get(prompt, "unknown"))
+    # Fallback for non-structured responses
+    return "Mock string response"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mock_llm() -> Generator[None, None, None]:
+    """Install the mocked LLM once for every test in this module."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            "api.batch.processor.process_with_llm", mock_process_with_llm
+        )
+        yield
+
+
+# Built once at import; the endpoint never mutates the posted payload, and
+# the identical schema lets every case share one cached dynamic model
+ENUM_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "DynamicSchema",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "status": {
+                    "type": "string",
+                    "enum": list(ENUM_VALUES),
+                    "description": f"Must be one of: {', '.join(ENUM_VALUES)}",
+                }
+            },
+            "required": ["status"],
+        },
+    },
+}
 
 
 class TestEnumSchema:
     """Tests for enum schema handling in the API."""
 
-    def setup_method(self):
-        """Set up test method."""
-        # Mock auth for all tests in this class
-        app.dependency_overrides = {}
-
     @pytest.mark.parametrize(
-        "test_id,prompt,enum_values,extract_path,expected_value",
-        [
-            (
-                "simple_value",
-                "The project status is active",
-                ["active", "pending", "completed"],
-                "status",
-                "active",  # This should pass with proper enum handling
-            ),
-            (
-                "clear_match",
-                "We're waiting for client approval. The status is pending.",
-                ["active", "pending", "completed"],
-                "status",
-                "pending",  # This should pass with proper enum handling
-            ),
-            (
-                "inference_required",
-                "The task has been completed as of yesterday.",
-                ["active", "pending", "completed"],
-                "status",
-                "completed",  # This requires the LLM to infer the status
-            ),
-            (
-                "similar_but_different",
-                "This project is in progress, but nearly done.",
-                ["active", "pending", "completed"],
-                "status",
-                "pending",  # "in progress, but nearly done" maps to "pending"
-            ),
-            (
-                "on_hold_case",
-                "Work is on hold until further notice.",
-                ["active", "pending", "completed"],
-                "status",
-                "pending",  # "on hold" should map to "pending"
-            ),
-        ],
+        "prompt,expected_value",
+        [case[1:] for case in SINGLE_PROMPT_CASES],
+        ids=[case[0] for case in SINGLE_PROMPT_CASES],
     )
-    @pytest.mark.llm  # Marked as llm as it tests interaction, though mocked
     def test_enum_schema_single_prompt(
-        self, monkeypatch, test_id, prompt, enum_values, extract_path, expected_value
+        self,
+        client: TestClient,
+        auth_headers: Dict[str, str],
+        prompt,
+        expected_value,
     ):
         """Test that enum constraints are properly enforced in schema."""
-
-        # Mock the process_with_llm function to avoid actual API calls
-        async def mock_process_with_llm(prompt_text, response_model=None, model=None):
-            """Mock version of process_with_llm that returns test data."""
-            if response_model:
-                if (
-                    hasattr(response_model, "__annotations__")
-                    and extract_path in response_model.__annotations__
-                ):
-                    result = {}
-                    # Simulate realistic (sometimes incorrect) LLM behavior
-                    if test_id == "simple_value":
-                        result[extract_path] = "active"  # Correct enum value
-                    elif test_id == "clear_match":
-                        result[extract_path] = "pending"  # Correct enum value
-                    elif test_id == "inference_required":
-                        # Simulate LLM correctly inferring from context
-                        result[extract_path] = "completed"
-                    elif test_id == "similar_but_different":
-                        # Simulate LLM needing guidance for ambiguous terms
-                        result[extract_path] = "pending"
-                    elif test_id == "on_hold_case":
-                        # Simulate LLM mapping "on hold" correctly based on enum guidance
-                        result[extract_path] = "pending"
-                    else:
-                        # Default case if test_id isn't matched (shouldn't happen)
-                        result[extract_path] = "unknown"
-
-                    # Attempt to create the model instance. If the value isn't in the enum,
-                    # Pydantic *should* raise a ValidationError if properly configured.
-                    # However, our dynamic model creation might not enforce this directly.
-                    # The test relies on the *endpoint* returning success/error correctly.
-                    try:
-                        return response_model(**result)
-                    except Exception as e:
-                        # Log if model creation itself fails (unexpected here)
-                        logger.error(f"Mock response model creation failed: {e}")
-                        raise  # Re-raise unexpected errors
-                # Fallback if response_model doesn't match expected structure
-                return response_model()
-            # Fallback for non-structured responses
-            return "Mock string response"
-
-        # Apply the mock specifically to where it's used in the endpoint handler
-        monkeypatch.setattr("api.main.process_with_llm", mock_process_with_llm)
-
-        # Override auth for this test
-        app.dependency_overrides[api.main.verify_api_key] = lambda: "test_api_key"
-
-        # Create a schema with enum constraints
-        schema = {
-            "type": "object",
-            "properties": {
-                extract_path: {
-                    "type": "string",
-                    "enum": enum_values,
-                    "description": f"Must be one of: {', '.join(enum_values)}",
-                }
-            },
-            "required": [extract_path],
+        payload = {
+            "prompt": prompt,
+            "response_format": ENUM_RESPONSE_FORMAT,
+            "extract_field_path": "status",
         }
 
-        # Prepare the request
-        request = PromptRequest(
-            prompt=prompt,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {"name": "DynamicSchema", "schema": schema},
-            },
-            extract_field_path=extract_path,
-        )
-
-        # Make the request
-        response = client.post("/api/v1/prompt", json=request.model_dump())
-
-        # Clean up dependency override after test
-        app.dependency_overrides = {}
+        response = client.post("/api/v1/prompt", json=payload, headers=auth_headers)
 
         # Verify the response status code first
         assert response.status_code == 200, (
@@ -160,92 +123,44 @@ class TestEnumSchema:
             f"Expected response value '{expected_value}', got '{response_json.get('response')}'"
         )
 
-    def test_enum_schema_batch(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_enum_schema_batch(
+        self, async_client: httpx.AsyncClient, auth_headers: Dict[str, str]
+    ):
         """Test that enum constraints are properly enforced in batch requests."""
-
-        # Mock the process_with_llm function to avoid actual API calls
-        async def mock_process_with_llm(prompt_text, response_model=None, model=None):
-            """Mock version of process_with_llm that returns test data."""
-            # If response_model is provided, return an instance of it
-            if response_model:
-                # For testing purposes, this simulates what's currently happening
-                if "status is active" in prompt_text:
-                    return response_model(status="active and progressing well")
-                elif "status is pending" in prompt_text:
-                    return response_model(status="pending")
-                elif "has been completed" in prompt_text:
-                    return response_model(
-                        status="The task has been completed as of yesterday"
-                    )
-                else:
-                    return response_model(status="unknown")
-
-            # For simple string responses
-            return "Mock response"
-
-        # Apply the mock
-        import api.llm.processor
-
-        monkeypatch.setattr(
-            api.llm.processor, "process_with_llm", mock_process_with_llm
-        )
-
-        # Override auth for this test
-        app.dependency_overrides = {api.main.verify_api_key: lambda: "test_api_key"}
-
-        # Create a schema with enum constraints
-        schema = {
-            "type": "object",
-            "properties": {
-                "status": {
-                    "type": "string",
-                    "enum": ["active", "pending", "completed"],
-                    "description": "Must be one of: active, pending, completed",
+        payload = {
+            "prompts": [
+                {
+                    "prompt": prompt,
+                    "response_format": ENUM_RESPONSE_FORMAT,
+                    "extract_field_path": "status",
                 }
-            },
-            "required": ["status"],
+                for prompt, _ in BATCH_CASES
+            ]
         }
 
-        # Create batch request with multiple prompts
-        prompts = [
-            PromptRequest(
-                prompt="The project status is active and progressing well",
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {"name": "DynamicSchema", "schema": schema},
-                },
-                extract_field_path="status",
-            ),
-            PromptRequest(
-                prompt="We're waiting for client approval. The status is pending",
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {"name": "DynamicSchema", "schema": schema},
-                },
-                extract_field_path="status",
-            ),
-            PromptRequest(
-                prompt="The task has been completed as of yesterday",
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {"name": "DynamicSchema", "schema": schema},
-                },
-                extract_field_path="status",
-            ),
-        ]
-
-        request = MultiplePromptsRequest(prompts=prompts)
-
-        # Make the request
-        response = client.post("/api/v1/prompts", json=request.model_dump())
+        response = await async_client.post(
+            "/api/v1/prompts", json=payload, headers=auth_headers
+        )
 
         # Verify the response
         assert response.status_code == 200
 
-        # Expected values if enum constraints were enforced
-        expected_values = ["active", "pending", "completed"]
+        responses = response.json()["responses"]
+        for i, (_, expected) in enumerate(BATCH_CASES):
+            assert responses[i]["response"] == expected
 
-        # Currently, the test will fail because enum constraints aren't properly
-        # enforced
-        for i, expected in enumerate(expected_values):
-            assert response.json()["responses"][i]["response"] == expected
+    def test_enum_schema_rejects_value_outside_enum(
+        self, client: TestClient, auth_headers: Dict[str, str]
+    ):
+        """Test that an LLM answer outside the enum becomes an error response."""
+        payload = {
+            "prompt": "Unrecognized status",
+            "response_format": ENUM_RESPONSE_FORMAT,
+            "extract_field_path": "status",
+        }
+
+        response = client.post("/api/v1/prompt", json=payload, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "error"
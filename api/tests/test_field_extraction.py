@@ -1,16 +1,22 @@
 """Tests for field extraction functionality in the prompt endpoint."""
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+import pytest
 from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from api.field_extraction import compile_field_path, extract_field_validated
 
 
 def test_field_extraction_top_level(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str], sample_schema: dict
+    client: TestClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    sample_schema: dict,
 ) -> None:
     """Test extraction of a top-level field from the generated JSON."""
-    mock_llm = mocker.patch("api.main.process_with_llm")
-    mock_llm.return_value = {"output": "test value"}
+    mocked_llm.return_value = {"output": "test value"}
 
     payload = {
         "prompt": "Test prompt",
@@ -26,11 +32,13 @@ def test_field_extraction_top_level(
 
 
 def test_field_extraction_nested(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str], nested_schema: dict
+    client: TestClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    nested_schema: dict,
 ) -> None:
     """Test extraction of a nested field from the generated JSON."""
-    mock_llm = mocker.patch("api.main.process_with_llm")
-    mock_llm.return_value = {
+    mocked_llm.return_value = {
         "user": {
             "name": "John Doe",
             "age": 30,
@@ -52,101 +60,85 @@ def test_field_extraction_nested(
     assert data["response"] == "London"
 
 
-def test_field_extraction_different_types(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str], nested_schema: dict
+NESTED_RESPONSE = {
+    "user": {
+        "name": "John Doe",
+        "age": 30,
+        "address": {"city": "London", "country": "UK"},
+    },
+    "active": True,
+}
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    [("user.name", "John Doe"), ("user.age", 30), ("active", True)],
+)
+def test_field_extraction_types(
+    client: TestClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    nested_schema: dict,
+    path: str,
+    expected: Any,
 ) -> None:
     """Test extraction of fields with different data types."""
-    mock_llm = mocker.patch("api.main.process_with_llm")
-    mock_llm.return_value = {
-        "user": {
-            "name": "John Doe",
-            "age": 30,
-            "address": {"city": "London", "country": "UK"},
-        },
-        "active": True,
-    }
-
-    # Test string extraction
-    response = client.post(
-        "/api/v1/prompt",
-        json={
-            "prompt": "Test prompt",
-            "response_format": {"type": "json_schema", "json_schema": nested_schema},
-            "extract_field_path": "user.name",
-        },
-        headers=auth_headers,
-    )
-    assert response.json()["response"] == "John Doe"
+    mocked_llm.return_value = NESTED_RESPONSE
 
-    # Test number extraction
     response = client.post(
         "/api/v1/prompt",
         json={
             "prompt": "Test prompt",
             "response_format": {"type": "json_schema", "json_schema": nested_schema},
-            "extract_field_path": "user.age",
+            "extract_field_path": path,
         },
         headers=auth_headers,
     )
-    assert response.json()["response"] == 30
 
-    # Test boolean extraction
-    response = client.post(
-        "/api/v1/prompt",
-        json={
-            "prompt": "Test prompt",
-            "response_format": {"type": "json_schema", "json_schema": nested_schema},
-            "extract_field_path": "active",
-        },
-        headers=auth_headers,
-    )
-    assert response.json()["response"] is True
+    assert response.status_code == 200
+    assert response.json()["response"] == expected
+    assert type(response.json()["response"]) is type(expected)
 
 
+@pytest.mark.parametrize(
+    "path,message",
+    [
+        ("user.nonexistent", "Field not found"),
+        ("user..name", "Invalid field path format"),
+    ],
+)
 def test_field_extraction_invalid_path(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str], nested_schema: dict
+    client: TestClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    nested_schema: dict,
+    path: str,
+    message: str,
 ) -> None:
     """Test handling of invalid field paths."""
-    mock_llm = mocker.patch("api.main.process_with_llm")
-    mock_llm.return_value = {"user": {"name": "John Doe", "age": 30}}
+    mocked_llm.return_value = {"user": {"name": "John Doe", "age": 30}}
 
-    # Test non-existent field
     response = client.post(
         "/api/v1/prompt",
         json={
             "prompt": "Test prompt",
             "response_format": {"type": "json_schema", "json_schema": nested_schema},
-            "extract_field_path": "user.nonexistent",
+            "extract_field_path": path,
         },
         headers=auth_headers,
     )
-    assert response.status_code == 200
-    data = response.json()
-    assert data["status"] == "error"
-    assert "Field not found" in data["error"]
 
-    # Test invalid path format
-    response = client.post(
-        "/api/v1/prompt",
-        json={
-            "prompt": "Test prompt",
-            "response_format": {"type": "json_schema", "json_schema": nested_schema},
-            "extract_field_path": "user..name",  # Invalid path format
-        },
-        headers=auth_headers,
-    )
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "error"
-    assert "Invalid field path format" in data["error"]
+    assert message in data["error"]
 
 
 def test_field_extraction_requires_schema(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    client: TestClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
     """Test that field extraction requires a schema to be provided."""
-    mock_llm = mocker.patch("api.main.process_with_llm")
-    mock_llm.return_value = "Some response"
+    mocked_llm.return_value = "Some response"
 
     response = client.post(
         "/api/v1/prompt",
@@ -160,3 +152,52 @@ def test_field_extraction_requires_schema(
     data = response.json()
     assert data["status"] == "error"
     assert "Field extraction requires a schema" in data["error"]
+
+
+def test_extract_field_validated_walks_nested_path() -> None:
+    """Test that the fused validate-and-extract helper returns nested values."""
+    data = {"user": {"address": {"city": "London"}}}
+    assert extract_field_validated(data, "user.address.city", True) == "London"
+
+
+def test_extract_field_validated_walks_model() -> None:
+    """Test that fields are extracted from a model without dumping it whole."""
+
+    class Address(BaseModel):
+        city: str
+
+    class User(BaseModel):
+        name: str
+        addresses: List[Address]
+
+    user = User(name="Alice", addresses=[Address(city="London")])
+
+    assert extract_field_validated(user, "name", True) == "Alice"
+    assert extract_field_validated(user, "addresses", True) == [{"city": "London"}]
+    with pytest.raises(ValueError, match="Field not found: age"):
+        extract_field_validated(user, "age", True)
+
+
+def test_compile_field_path_is_cached() -> None:
+    """Test that a field path is split once and reused."""
+    assert compile_field_path("user.address.city") == ("user", "address", "city")
+    assert compile_field_path("user.address.city") is compile_field_path(
+        "user.address.city"
+    )
+
+
+@pytest.mark.parametrize(
+    "data,field_path,has_schema,message",
+    [
+        ({"a": 1}, "a", False, "Field extraction requires a schema"),
+        ("text", "a", True, "Cannot extract fields from non-structured data: str"),
+        ({"a": 1}, "a..b", True, "Invalid field path format"),
+        ({"a": {"b": 1}}, "a.c.d", True, "Field not found: a.c"),
+    ],
+)
+def test_extract_field_validated_errors(
+    data: Any, field_path: str, has_schema: bool, message: str
+) -> None:
+    """Test that the fused helper raises the same errors as the two-step path."""
+    with pytest.raises(ValueError, match=message):
+        extract_field_validated(data, field_path, has_schema)
@@ -1,5 +1,7 @@
 """Tests for LLM processing utilities."""
 
+import asyncio
+from types import SimpleNamespace
 from typing import List
 from unittest.mock import AsyncMock
 
@@ -8,10 +10,10 @@ import openai
 import pytest
 from pydantic import BaseModel
 
-from api.llm.processor import process_with_llm
+from api.llm.processor import _instructor_schema, process_with_llm
 
-# Mark all tests in this file as asyncio
-pytestmark = pytest.mark.asyncio
+# Mark all tests in this file as asyncio, sharing one event loop per module
+pytestmark = pytest.mark.asyncio(loop_scope="module")
 
 
 # --- Add Pydantic Model for Instructor Test ---
@@ -29,31 +31,43 @@ class Person(BaseModel):
 # ---------------------------------------------
 
 
-# Helper to create a mock OpenAI ChatCompletion response object
-# Needs refining based on actual OpenAI object structure if tests fail
-def create_mock_completion(content: str) -> AsyncMock:
-    mock_message = AsyncMock()
-    mock_message.content = content
-    mock_choice = AsyncMock()
-    mock_choice.message = mock_message
-    mock_completion = AsyncMock()
-    mock_completion.choices = [mock_choice]
-    return mock_completion
+# Helper to create a mock OpenAI ChatCompletion response object. Plain
+# namespaces are enough: process_with_llm only reads choices[0].message.content
+def create_mock_completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
 
 
-async def test_process_with_llm_no_schema(mocker):
-    """Test process_with_llm returns a string using the OpenAI client."""
-    # Mock the OpenAI client call
-    mock_openai_create = mocker.patch(
-        "api.llm.processor.client.chat.completions.create", new_callable=AsyncMock
+@pytest.fixture(scope="module")
+def mock_openai_create() -> AsyncMock:
+    """Provide one AsyncMock standing in for chat.completions.create."""
+    return AsyncMock()
+
+
+@pytest.fixture(scope="module")
+def fake_llm_client(mock_openai_create: AsyncMock) -> SimpleNamespace:
+    """Provide a client exposing only what process_with_llm touches."""
+    return SimpleNamespace(
+        api_key="test_openrouter_key",
+        chat=SimpleNamespace(completions=SimpleNamespace(create=mock_openai_create)),
     )
 
+
+@pytest.fixture(autouse=True)
+def reset_openai_create(mock_openai_create: AsyncMock) -> None:
+    """Clear calls, return values and side effects left by the previous test."""
+    mock_openai_create.reset_mock(return_value=True, side_effect=True)
+
+
+async def test_process_with_llm_no_schema(fake_llm_client, mock_openai_create):
+    """Test process_with_llm returns a string using the OpenAI client."""
     # Configure mock to return a simulated OpenAI response object with string content
     expected_content = "Mocked LLM response"
     mock_openai_create.return_value = create_mock_completion(expected_content)
 
     # Call the function without a response_model
-    result = await process_with_llm("Test prompt")
+    result = await process_with_llm(fake_llm_client, "Test prompt")
 
     # Assertions
     assert result == expected_content
@@ -66,14 +80,8 @@ async def test_process_with_llm_no_schema(mocker):
     )
 
 
-async def test_process_with_llm_with_instructor(mocker):
+async def test_process_with_llm_with_instructor(fake_llm_client, mock_openai_create):
     """Test process_with_llm returns a Pydantic model using Instructor."""
-    # Mock the actual method called by the patched client
-    # The path depends on where 'client' is defined in api.llm
-    mock_openai_create = mocker.patch(
-        "api.llm.processor.client.chat.completions.create", new_callable=AsyncMock
-    )
-
     # Expected data
     expected_data = UserInfo(name="Test User", age=30)
 
@@ -83,44 +91,67 @@ async def test_process_with_llm_with_instructor(mocker):
     mock_openai_create.return_value = expected_data
 
     # Call the function, passing the Pydantic model
-    result = await process_with_llm("Extract user info", response_model=UserInfo)
+    result = await process_with_llm(
+        fake_llm_client, "Extract user info", response_model=UserInfo
+    )
 
     # Assertions
     assert isinstance(result, UserInfo)
     assert result == expected_data  # Compare model instances
 
-    # Assert the mock was called correctly
+    # Assert the mock was called correctly, with the cached Instructor wrapper
     mock_openai_create.assert_awaited_once_with(
         model="google/gemini-2.0-flash-lite-001",  # Default model
         messages=[{"role": "user", "content": "Extract user info"}],
-        response_model=UserInfo,
+        response_model=_instructor_schema(UserInfo),
     )
 
 
-async def test_process_with_llm_handles_api_error(mocker):
+async def test_process_with_llm_handles_api_error(fake_llm_client, mock_openai_create):
     """Test process_with_llm raises exception on API error."""
-    # Mock the client call to raise an OpenAI APIError
-    mock_openai_create = mocker.patch(
-        "api.llm.processor.client.chat.completions.create", new_callable=AsyncMock
-    )
-
-    # Correctly instantiate APIError (may need httpx request mock if constructor
-    # needs it)
-    # Let's try with a simple mocked request first.
-    mock_request = mocker.Mock(spec=httpx.Request)
+    # APIError only stores the request, so a plain httpx.Request is enough;
+    # a spec'd mock would introspect the whole class for nothing
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
     mock_openai_create.side_effect = openai.APIError(
         "Simulated API Error",
-        request=mock_request,  # Use 'request' argument
+        request=request,  # Use 'request' argument
         body=None,
     )
 
     with pytest.raises(Exception, match="OpenRouter API error: Simulated API Error"):
-        await process_with_llm("Error prompt")
+        await process_with_llm(fake_llm_client, "Error prompt")
+
+
+async def test_process_with_llm_coalesces_identical_calls(
+    fake_llm_client, mock_openai_create
+):
+    """Test that concurrent identical calls share one LLM request."""
+
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.01)
+        return create_mock_completion(kwargs["messages"][0]["content"].upper())
+
+    mock_openai_create.side_effect = slow_completion
+
+    results = await asyncio.gather(
+        process_with_llm(fake_llm_client, "same prompt"),
+        process_with_llm(fake_llm_client, "same prompt"),
+        process_with_llm(fake_llm_client, "other prompt"),
+    )
+
+    assert results == ["SAME PROMPT", "SAME PROMPT", "OTHER PROMPT"]
+    assert mock_openai_create.await_count == 2
+
+    # Finished calls are not cached: the next identical call is made again
+    await process_with_llm(fake_llm_client, "same prompt")
+    assert mock_openai_create.await_count == 3
 
 
 # --- Integration Test ---
 @pytest.mark.llm  # Mark as integration test requiring LLM
-async def test_process_with_llm_instructor_integration():
+# Runs on its own loop, like the function-scoped llm_client fixture it uses
+@pytest.mark.asyncio(loop_scope="function")
+async def test_process_with_llm_instructor_integration(llm_client):
     """
     Integration test for process_with_llm with Instructor to extract structured
     data.
@@ -131,7 +162,9 @@ async def test_process_with_llm_instructor_integration():
 
     try:
         # Call the actual function, targeting List[Person]
-        result = await process_with_llm(prompt=input_text, response_model=List[Person])
+        result = await process_with_llm(
+            llm_client, prompt=input_text, response_model=List[Person]
+        )
 
         print(f"Raw result from process_with_llm: {result}")
 
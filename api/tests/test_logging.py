@@ -1,9 +1,9 @@
 """Test Logfire integration with pytest."""
 
 import os
-import time
 from pathlib import Path
 
+import pytest
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -12,6 +12,20 @@ if env_path.exists():
     load_dotenv(env_path)
 
 
+class FakeClock:
+    """Clock that only moves when slept on, so timing tests don't wait."""
+
+    def __init__(self, start: float = 1_000.0) -> None:
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.mark.integration
 def test_logfire_token_exists():
     """Test that LOGFIRE_TOKEN is set in the environment."""
     assert "LOGFIRE_TOKEN" in os.environ, "LOGFIRE_TOKEN must be set in environment"
@@ -21,14 +35,8 @@ def test_logfire_basic_integration():
     """Test basic Logfire integration."""
     import logfire
 
-    # Configure Logfire
-    logfire.configure(
-        service_name="humble-clay-api-test",
-        service_version="0.1.0",
-        environment="testing",
-    )
-
-    # Test basic logging
+    # Logfire is configured once per session by the configure_logfire fixture,
+    # so this only checks that logging through it works
     logfire.info("Starting test logging", test_name="test_logfire_basic_integration")
 
     # This test passes if no exceptions are raised
@@ -39,16 +47,8 @@ def test_batch_processing_monitoring():
     """Test batch processing monitoring with spans."""
     import logfire
 
-    # Configure Logfire if not already configured
-    try:
-        logfire.configure(
-            service_name="humble-clay-api-test",
-            service_version="0.1.0",
-            environment="testing",
-        )
-    except:
-        # Already configured, continue
-        pass
+    # Simulated work advances a fake clock instead of sleeping
+    clock = FakeClock()
 
     # Track timing for verification
     times = {
@@ -59,7 +59,7 @@ def test_batch_processing_monitoring():
 
     # Simulate batch processing with spans
     with logfire.span("batch_processing", attributes={"total_prompts": 10}):
-        times["batch_start"] = time.time()
+        times["batch_start"] = clock.time()
 
         # Log batch start
         logfire.info("Starting batch processing", total_prompts=10)
@@ -69,7 +69,7 @@ def test_batch_processing_monitoring():
             with logfire.span(
                 f"batch_{batch_number}", attributes={"batch_number": batch_number}
             ):
-                batch_start = time.time()
+                batch_start = clock.time()
                 logfire.info(
                     f"Processing batch {batch_number}/2",
                     batch_number=batch_number,
@@ -81,11 +81,11 @@ def test_batch_processing_monitoring():
                 # Simulate processing 5 items (reduced time for faster tests)
                 for i in range(5):
                     # Simulate some work (reduced for testing)
-                    time.sleep(0.02)
+                    clock.sleep(0.02)
 
                     # If this is the first item of the first batch, record first result
                     if batch_number == 1 and i == 0:
-                        times["first_result"] = time.time()
+                        times["first_result"] = clock.time()
                         time_to_first = times["first_result"] - times["batch_start"]
                         logfire.info(
                             "First result completed",
@@ -93,7 +93,7 @@ def test_batch_processing_monitoring():
                         )
 
                 # Batch completed
-                batch_duration = time.time() - batch_start
+                batch_duration = clock.time() - batch_start
                 logfire.info(
                     f"Completed batch {batch_number}/2",
                     batch_number=batch_number,
@@ -107,7 +107,7 @@ def test_batch_processing_monitoring():
                 )
 
         # Record end time
-        times["batch_end"] = time.time()
+        times["batch_end"] = clock.time()
 
         # Log batch completion with timing metrics
         logfire.info(
@@ -4,18 +4,11 @@ import pytest
 from pydantic import ValidationError
 
 from api.models import PromptResponse  # Assuming models are in api.models
+from api.response.handlers import prepare_error_response, prepare_success_response
 
 # --- Tests for PromptResponse model flexibility ---
 
 
-def test_prompt_response_accepts_string():
-    """Test PromptResponse accepts string in response field."""
-    resp = PromptResponse(status="success", response="This is a string")
-    assert resp.response == "This is a string"
-    assert resp.status == "success"
-    assert resp.error is None
-
-
 def test_prompt_response_accepts_none():
     """Test PromptResponse accepts None in response field."""
     resp = PromptResponse(status="error", response=None, error="Something failed")
@@ -24,66 +17,66 @@ def test_prompt_response_accepts_none():
     assert resp.error == "Something failed"
 
 
-# These tests SHOULD FAIL until the model is updated
-def test_prompt_response_accepts_number():
-    """Test PromptResponse accepts numbers (int/float) in response field."""
-    resp_int = PromptResponse(status="success", response=123)
-    assert resp_int.response == 123
-    resp_float = PromptResponse(status="success", response=123.45)
-    assert resp_float.response == 123.45
-
-
-def test_prompt_response_accepts_boolean():
-    """Test PromptResponse accepts booleans in response field."""
-    resp_true = PromptResponse(status="success", response=True)
-    assert resp_true.response is True
-    resp_false = PromptResponse(status="success", response=False)
-    assert resp_false.response is False
-
-
-# This test ensures invalid types are still rejected
-def test_prompt_response_accepts_structured_data():
-    """
-    Test PromptResponse accepts dictionaries and lists (structured data) in
-    response field.
-    """
-    # Test with dictionary
-    resp_dict = PromptResponse(status="success", response={"name": "John", "age": 30})
-    assert resp_dict.response == {"name": "John", "age": 30}
+@pytest.mark.parametrize(
+    "value",
+    [
+        "This is a string",
+        123,
+        123.45,
+        True,
+        False,
+        {"name": "John", "age": 30},
+        ["item1", "item2"],
+        {"user": {"name": "John", "skills": ["Python", "JavaScript"]}},
+    ],
+    ids=["string", "int", "float", "true", "false", "dict", "list", "nested"],
+)
+def test_prompt_response_accepts(value):
+    """Test PromptResponse accepts scalars and structured data unchanged."""
+    resp = PromptResponse(status="success", response=value)
+    assert resp.response == value
+    # bool must not be coerced to int (or vice versa)
+    assert type(resp.response) is type(value)
+    assert resp.status == "success"
+    assert resp.error is None
 
-    # Test with list
-    resp_list = PromptResponse(status="success", response=["item1", "item2"])
-    assert resp_list.response == ["item1", "item2"]
 
-    # Test with nested structures
-    resp_nested = PromptResponse(
-        status="success",
-        response={"user": {"name": "John", "skills": ["Python", "JavaScript"]}},
-    )
-    assert resp_nested.response["user"]["skills"] == ["Python", "JavaScript"]
+class _Unsupported:
+    pass
 
 
-def test_prompt_response_rejects_invalid_types():
+# Invalid types must still be rejected
+@pytest.mark.parametrize(
+    "value",
+    [_Unsupported, lambda x: x, complex(1, 2), _Unsupported()],
+    ids=["class", "function", "complex", "instance"],
+)
+def test_prompt_response_rejects_invalid_types(value):
     """Test PromptResponse rejects truly unsupported types."""
-
-    class TestClass:
-        pass
-
-    # Class object should be rejected
-    with pytest.raises(ValidationError):
-        PromptResponse(status="success", response=TestClass)
-
-    # Function object should be rejected
-    with pytest.raises(ValidationError):
-        PromptResponse(status="success", response=lambda x: x)
-
-    # Complex number should be rejected (not JSON serializable)
-    with pytest.raises(ValidationError):
-        PromptResponse(status="success", response=complex(1, 2))
-
-    # Custom object should be rejected
     with pytest.raises(ValidationError):
-        PromptResponse(status="success", response=TestClass())
+        PromptResponse(status="success", response=value)
+
+
+def test_prepare_error_response_matches_validated_model():
+    """Test the unvalidated error factory matches a regular error response."""
+    resp = prepare_error_response("Something failed")
+    assert resp == PromptResponse(status="error", error="Something failed")
+    assert resp.model_dump() == {
+        "status": "error",
+        "response": None,
+        "error": "Something failed",
+    }
+
+
+def test_prepare_success_response_matches_validated_model():
+    """Test the unvalidated success factory matches a regular response."""
+    resp = prepare_success_response({"name": "Alice"})
+    assert resp == PromptResponse(response={"name": "Alice"})
+    assert resp.model_dump() == {
+        "status": "success",
+        "response": {"name": "Alice"},
+        "error": None,
+    }
 
 
 # --- End tests for PromptResponse model flexibility ---
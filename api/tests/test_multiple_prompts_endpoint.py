@@ -1,30 +1,105 @@
 """Tests for the multiple prompt processing endpoint (/api/v1/prompts)."""
 
-from typing import Any, Dict
+import json
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Generator, Union
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from api.core.dependencies import get_llm_client
+from api.main import app
+from api.models import PromptResponse
+
+# Bodies MultiplePromptsRequest must reject, serialized once at import
+EMPTY_PAYLOAD = json.dumps({"prompts": []}).encode()
+# One prompt over MultiplePromptsRequest's limit
+OVERSIZE_PAYLOAD = json.dumps({"prompts": [{"prompt": "test"}] * 1001}).encode()
+
+# 15-prompt batch shared by the order and error tests, built once at import
+BATCH_PROMPTS = [{"prompt": f"Prompt {i}"} for i in range(15)]
+BATCH_BODY = {"prompts": BATCH_PROMPTS}
+# Keyed by prompt: the batch dispatches longest prompts first, so the fake
+# can't rely on call order
+BATCH_RESPONSES = {f"Prompt {i}": f"Response {i}" for i in range(15)}
+
+
+def answer_by_prompt(responses: Dict[str, Union[str, Exception]]) -> Callable:
+    """Build a process_with_llm side effect answering from a prompt-keyed table.
+
+    The batch dispatches the longest prompts first, so a list side effect
+    consumed in call order would hand answers to the wrong prompts.
+    """
+
+    def answer(llm_client: Any, prompt: str, **kwargs: Any) -> str:
+        result = responses[prompt]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return answer
+
+
+class FakeLLMClient:
+    """In-process stand-in for the AsyncOpenAI client, answering by prompt.
+
+    Exceptions in the response table are raised instead of returned, so
+    process_with_llm runs for real without any Mock in the call path.
+    """
+
+    api_key = "fake_openrouter_key"
+
+    def __init__(self) -> None:
+        self.responses: Dict[str, Union[str, Exception]] = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: list, **kwargs: Any) -> Any:
+        answer = self.responses[messages[0]["content"]]
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))]
+        )
+
+
+@pytest.fixture
+def fake_llm() -> Generator[FakeLLMClient, None, None]:
+    """Serve the prompt endpoints from a FakeLLMClient for one test."""
+    fake = FakeLLMClient()
+    app.dependency_overrides[get_llm_client] = lambda: fake
+    yield fake
+    app.dependency_overrides.pop(get_llm_client, None)
+
+
 # Multiple prompts tests (Moved from test_prompt_endpoints.py)
 
 
+@pytest.mark.parametrize(
+    "payload",
+    [EMPTY_PAYLOAD, OVERSIZE_PAYLOAD],
+    ids=["empty_array", "over_batch_limit"],
+)
 def test_multiple_prompts_endpoint_validates_input(
-    client: TestClient, auth_headers: Dict[str, str]
+    client: TestClient, auth_headers: Dict[str, str], payload: bytes
 ) -> None:
     """Test input validation for multiple prompts endpoint."""
-    # Empty array
     response = client.post(
-        "/api/v1/prompts", json={"prompts": []}, headers=auth_headers
+        "/api/v1/prompts",
+        content=payload,
+        headers={**auth_headers, "Content-Type": "application/json"},
     )
     assert response.status_code == 422
+    assert "detail" in response.json()
 
 
 def test_multiple_prompts_endpoint_processes_requests(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    client: TestClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
     """Test successful processing of multiple prompts."""
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = ["Response 1", "Response 2"]
+    mocked_llm.side_effect = answer_by_prompt(
+        {"Prompt 1": "Response 1", "Prompt 2": "Response 2"}
+    )
 
     response = client.post(
         "/api/v1/prompts",
@@ -42,11 +117,12 @@ def test_multiple_prompts_endpoint_processes_requests(
 
 
 def test_multiple_prompts_endpoint_handles_partial_failure(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    client: TestClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
     """Test handling of partial failures in multiple prompts."""
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = ["Success", Exception("Failed")]
+    mocked_llm.side_effect = answer_by_prompt(
+        {"Prompt 1": "Success", "Prompt 2": Exception("Failed")}
+    )
 
     response = client.post(
         "/api/v1/prompts",
@@ -62,11 +138,16 @@ def test_multiple_prompts_endpoint_handles_partial_failure(
 
 
 def test_multiple_prompts_maintains_order(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    client: TestClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
-    """Test that responses maintain the same order as input prompts."""
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = ["First response", "Second response", "Third response"]
+    """Test that responses keep the input order whatever the dispatch order."""
+    mocked_llm.side_effect = answer_by_prompt(
+        {
+            "First prompt": "First response",
+            "Second prompt": "Second response",
+            "Third prompt": "Third response",
+        }
+    )
 
     response = client.post(
         "/api/v1/prompts",
@@ -87,6 +168,10 @@ def test_multiple_prompts_maintains_order(
     assert data["responses"][1]["response"] == "Second response"
     assert data["responses"][2]["response"] == "Third response"
 
+    # The longest prompt starts first; equal lengths keep their input order
+    dispatched = [call.args[1] for call in mocked_llm.call_args_list]
+    assert dispatched == ["Second prompt", "First prompt", "Third prompt"]
+
 
 @pytest.mark.llm
 def test_multiple_prompts_endpoint_integration(
@@ -114,16 +199,15 @@ def test_multiple_prompts_endpoint_integration(
 
 @pytest.mark.asyncio
 async def test_batch_processing_order(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    async_client: httpx.AsyncClient,
+    fake_llm: FakeLLMClient,
+    auth_headers: Dict[str, str],
 ) -> None:
     """Test that batch processing maintains prompt order."""
-    prompts = [{"prompt": f"Prompt {i}"} for i in range(15)]
-    mock_responses = [f"Response {i}" for i in range(15)]
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = mock_responses
+    fake_llm.responses = BATCH_RESPONSES
 
-    response = client.post(
-        "/api/v1/prompts", json={"prompts": prompts}, headers=auth_headers
+    response = await async_client.post(
+        "/api/v1/prompts", json=BATCH_BODY, headers=auth_headers
     )
 
     assert response.status_code == 200
@@ -136,22 +220,17 @@ async def test_batch_processing_order(
 
 @pytest.mark.asyncio
 async def test_batch_error_handling(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    async_client: httpx.AsyncClient,
+    fake_llm: FakeLLMClient,
+    auth_headers: Dict[str, str],
 ) -> None:
     """Test that errors in one batch don't affect others."""
-    prompts = [{"prompt": f"Prompt {i}"} for i in range(15)]
-
-    # Updated to handle response_model parameter
-    async def mock_response(prompt: str, response_model=None, model=None) -> str:
-        if prompt in ["Prompt 3", "Prompt 12"]:
-            raise Exception("Test error")
-        return f"Success for {prompt}"
-
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = mock_response
+    fake_llm.responses = {prompt: f"Success for {prompt}" for prompt in BATCH_RESPONSES}
+    fake_llm.responses["Prompt 3"] = Exception("Test error")
+    fake_llm.responses["Prompt 12"] = Exception("Test error")
 
-    response = client.post(
-        "/api/v1/prompts", json={"prompts": prompts}, headers=auth_headers
+    response = await async_client.post(
+        "/api/v1/prompts", json=BATCH_BODY, headers=auth_headers
     )
 
     assert response.status_code == 200
@@ -163,6 +242,72 @@ async def test_batch_error_handling(
     assert data["responses"][13]["status"] == "success"
 
 
+@pytest.mark.asyncio
+async def test_batch_streaming_returns_ndjson(
+    async_client: httpx.AsyncClient,
+    fake_llm: FakeLLMClient,
+    auth_headers: Dict[str, str],
+) -> None:
+    """Test that ?stream=true streams one indexed NDJSON line per prompt."""
+    fake_llm.responses = dict(BATCH_RESPONSES)
+    fake_llm.responses["Prompt 3"] = Exception("Test error")
+
+    response = await async_client.post(
+        "/api/v1/prompts",
+        params={"stream": "true"},
+        json=BATCH_BODY,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Lines come in completion order; each carries the index of its prompt
+    by_index = {line["index"]: line for line in lines}
+    assert len(lines) == 15
+    assert sorted(by_index) == list(range(15))
+    assert by_index[3]["status"] == "error"
+    assert by_index[0]["status"] == "success"
+    assert by_index[0]["response"] == "Response 0"
+
+
+@pytest.mark.asyncio
+async def test_batch_streaming_ends_with_error_line_on_failure(
+    async_client: httpx.AsyncClient, mocker: Any, auth_headers: Dict[str, str]
+) -> None:
+    """Test that a batch failing mid-stream ends with an unindexed error line."""
+
+    async def failing_stream(llm_client: Any, prompt_request: Any):
+        yield 0, PromptResponse(status="success", response="Response 0")
+        raise RuntimeError("Batch failed")
+
+    mocker.patch("api.routes.prompts.stream_multiple_prompts", failing_stream)
+
+    response = await async_client.post(
+        "/api/v1/prompts",
+        params={"stream": "true"},
+        json=BATCH_BODY,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    first, last = [json.loads(line) for line in response.text.splitlines()]
+    assert first["index"] == 0
+    assert first["response"] == "Response 0"
+    assert last["index"] is None
+    assert last["status"] == "error"
+    assert last["error"] == "Error processing batch: Batch failed"
+
+
+def test_batch_openapi_declares_ndjson(client: TestClient) -> None:
+    """Test that the OpenAPI schema lists NDJSON as a /prompts response type."""
+    operation = client.get("/openapi.json").json()["paths"]["/api/v1/prompts"]
+
+    content = operation["post"]["responses"]["200"]["content"]
+    assert "application/json" in content
+    assert "application/x-ndjson" in content
+
+
 @pytest.mark.llm
 def test_batch_processing_integration(
     client: TestClient, auth_headers: Dict[str, str]
@@ -183,37 +328,25 @@ def test_batch_processing_integration(
 
 
 # Tests for optional fields (Moved from test_prompt_endpoints.py)
-# Fixture might be needed, move to conftest.py if required by both files
-@pytest.fixture
-def sample_schema() -> dict:
-    return {
-        "name": "test_schema",
-        "schema": {
-            "type": "object",
-            "properties": {"output": {"type": "string"}},
-            "required": ["output"],
-        },
-    }
-
-
 def test_multiple_prompts_accepts_optional_fields(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str], sample_schema: dict
+    client: TestClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    sample_schema: dict,
 ) -> None:
     """Test that multiple prompts endpoint accepts optional fields per prompt."""
-    # Setup mock with different responses for different calls
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
 
     # Define a dynamic side effect function to handle both structured and
     # unstructured outputs
-    async def mock_llm_response(prompt, response_model=None, model=None):
-        if response_model:
-            # Return a model instance with the output field
-            return response_model(output="Response 2 with schema/path")
+    async def mock_llm_response(llm_client, prompt, response_model=None, model=None):
+        # A single extracted string field skips the model and asks for raw text
+        if prompt.startswith("Prompt 2"):
+            return "Response 2 with schema/path"
         else:
             # Return a simple string for unstructured response
             return "Response 1"
 
-    mock_llm.side_effect = mock_llm_response
+    mocked_llm.side_effect = mock_llm_response
 
     payload = {
         "prompts": [
@@ -235,15 +368,16 @@ def test_multiple_prompts_accepts_optional_fields(
     assert len(data["responses"]) == 2
     assert data["responses"][0]["response"] == "Response 1"
     assert data["responses"][1]["response"] == "Response 2 with schema/path"
-    assert mock_llm.call_count == 2
+    assert mocked_llm.call_count == 2
 
 
 def test_multiple_prompts_works_without_optional_fields(
-    client: TestClient, mocker: Any, auth_headers: Dict[str, str]
+    client: TestClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
     """Test that multiple prompts endpoint works without optional fields."""
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.side_effect = ["Resp A", "Resp B"]
+    mocked_llm.side_effect = answer_by_prompt(
+        {"Prompt A": "Resp A", "Prompt B": "Resp B"}
+    )
 
     payload = {"prompts": [{"prompt": "Prompt A"}, {"prompt": "Prompt B"}]}
     response = client.post("/api/v1/prompts", json=payload, headers=auth_headers)
@@ -253,4 +387,4 @@ def test_multiple_prompts_works_without_optional_fields(
     assert len(data["responses"]) == 2
     assert data["responses"][0]["response"] == "Resp A"
     assert data["responses"][1]["response"] == "Resp B"
-    assert mock_llm.call_count == 2
+    assert mocked_llm.call_count == 2
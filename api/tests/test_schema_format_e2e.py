@@ -1,7 +1,7 @@
 """End-to-end tests for schema format compatibility between Apps Script and API."""
 
 import logging
-from typing import Any, Dict, cast
+from typing import Any, Dict, List, TypedDict
 
 import pytest
 from httpx import AsyncClient
@@ -11,32 +11,44 @@ from api.models import PromptRequest
 logger = logging.getLogger(__name__)
 
 
+class PersonResponse(TypedDict, total=False):
+    """Structured response for the person schemas used in these tests."""
+
+    name: str
+    age: int
+    skills: List[str]
+
+
+# Built once at import; tests only read it, so every test posts the same
+# schema and shares one cached dynamic model
+APPS_SCRIPT_FORMAT_SCHEMA: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "DynamicSchema",
+        "schema": {
+            "type": "object",
+            "properties": {"age": {"type": "number"}},
+            "required": ["age"],
+        },
+    },
+}
+
+
 @pytest.fixture
 def apps_script_format_schema() -> Dict[str, Any]:
     """Sample schema in the format that Apps Script would send."""
-    return {
-        "type": "json_schema",
-        "json_schema": {
-            "name": "DynamicSchema",
-            "schema": {
-                "type": "object",
-                "properties": {"age": {"type": "number"}},
-                "required": ["age"],
-            },
-        },
-    }
+    return APPS_SCRIPT_FORMAT_SCHEMA
 
 
 async def test_api_processes_apps_script_schema_format(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
     """Test that the API correctly processes the schema format sent by Apps Script."""
     # Mock the LLM to return a structured response matching the schema
-    mock_llm = mocker.patch("api.routes.prompts.process_with_llm")
-    mock_llm.return_value = {"age": 35}
+    mocked_llm.return_value = {"age": 35}
 
     # Create a request with the schema in the format Apps Script would send
     payload = {
@@ -45,7 +57,9 @@ async def test_api_processes_apps_script_schema_format(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompt", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompt", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -54,19 +68,19 @@ async def test_api_processes_apps_script_schema_format(
 
     # Verify the mock was called with a properly formatted schema
     # This checks that process_with_llm received the correct parameters
-    mock_llm_kwargs = mock_llm.call_args[1]
+    mock_llm_kwargs = mocked_llm.call_args[1]
     assert "response_model" in mock_llm_kwargs
     assert mock_llm_kwargs["response_model"] is not None
 
     # Verify the response contains the structured data
-    response_data = cast(Dict[str, Any], data["response"])
+    response_data: PersonResponse = data["response"]
     assert "age" in response_data
     assert response_data["age"] == 35
 
 
 async def test_api_processes_apps_script_schema_with_field_extraction(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
@@ -75,8 +89,7 @@ async def test_api_processes_apps_script_schema_with_field_extraction(
     Apps Script.
     """
     # Mock the LLM to return a structured response matching the schema
-    mock_llm = mocker.patch("api.routes.prompts.process_with_llm")
-    mock_llm.return_value = {"age": 35}
+    mocked_llm.return_value = {"age": 35}
 
     # Create a request with the schema and field path
     payload = {
@@ -86,7 +99,9 @@ async def test_api_processes_apps_script_schema_with_field_extraction(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompt", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompt", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -98,19 +113,17 @@ async def test_api_processes_apps_script_schema_with_field_extraction(
 
 
 async def test_batch_endpoint_with_apps_script_schema(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
     """Test the batch endpoint with the Apps Script schema format."""
     # Mock the LLM to return structured data with age field
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    # Use side_effect to return different values for different calls
-    mock_llm.side_effect = [
-        {"age": 35},  # First call
-        {"age": 28},  # Second call
-    ]
+    # Answer by prompt: the batch dispatches longest prompts first, so call
+    # order doesn't follow request order
+    responses = {"I'm 35 years old": {"age": 35}, "She is 28 years old": {"age": 28}}
+    mocked_llm.side_effect = lambda llm_client, prompt, **kwargs: responses[prompt]
 
     # Create a batch request with two items, both using the schema format
     payload = {
@@ -128,7 +141,9 @@ async def test_batch_endpoint_with_apps_script_schema(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -152,7 +167,7 @@ async def test_batch_endpoint_with_apps_script_schema(
 
 
 async def test_schema_matching_documentation_example(
-    client: AsyncClient, mocker: Any, auth_headers: Dict[str, str]
+    async_client: AsyncClient, mocked_llm: Any, auth_headers: Dict[str, str]
 ) -> None:
     """
     Test using the exact schema example from our documentation/UI.
@@ -178,8 +193,7 @@ async def test_schema_matching_documentation_example(
     }
 
     # Mock the LLM to return a matching response
-    mock_llm = mocker.patch("api.routes.prompts.process_with_llm")
-    mock_llm.return_value = {
+    mocked_llm.return_value = {
         "name": "John Smith",
         "age": 35,
         "skills": ["Python", "JavaScript", "SQL"],
@@ -191,7 +205,9 @@ async def test_schema_matching_documentation_example(
         "response_format": apps_script_formatted,
     }
 
-    response = await client.post("/api/v1/prompt", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompt", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -199,7 +215,7 @@ async def test_schema_matching_documentation_example(
     assert data["status"] == "success"
 
     # Verify the response contains all expected fields
-    response_data = cast(Dict[str, Any], data["response"])
+    response_data: PersonResponse = data["response"]
     assert "name" in response_data
     assert "age" in response_data
     assert "skills" in response_data
@@ -211,8 +227,8 @@ async def test_schema_matching_documentation_example(
 
 
 async def test_batch_endpoint_schema_validation_correct_parameters(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
@@ -221,9 +237,8 @@ async def test_batch_endpoint_schema_validation_correct_parameters(
     process_with_llm.
     """
     # Mock process_with_llm to track calls and parameters
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
     # Return a structured response
-    mock_llm.return_value = {"age": 35}
+    mocked_llm.return_value = {"age": 35}
 
     # Create a batch request with a schema
     payload = {
@@ -233,14 +248,16 @@ async def test_batch_endpoint_schema_validation_correct_parameters(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Verify the API call was successful
     assert response.status_code == 200
 
     # IMPORTANT: This is the key assertion that would have caught our bug
     # Verify process_with_llm was called with a response_model parameter
-    calls = mock_llm.call_args_list
+    calls = mocked_llm.call_args_list
     assert len(calls) > 0
     for call in calls:
         kwargs = call[1]
@@ -251,8 +268,8 @@ async def test_batch_endpoint_schema_validation_correct_parameters(
 
 
 async def test_batch_endpoint_returns_structured_data(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
@@ -260,8 +277,7 @@ async def test_batch_endpoint_returns_structured_data(
     Test that the batch endpoint returns structured data when a schema is provided.
     """
     # Mock the LLM to return a structured response
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.return_value = {"age": 35}
+    mocked_llm.return_value = {"age": 35}
 
     # Create a batch request with a schema
     payload = {
@@ -271,7 +287,9 @@ async def test_batch_endpoint_returns_structured_data(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -290,8 +308,8 @@ async def test_batch_endpoint_returns_structured_data(
 
 
 async def test_batch_endpoint_field_extraction(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
@@ -299,8 +317,7 @@ async def test_batch_endpoint_field_extraction(
     Test that the batch endpoint correctly extracts fields from structured responses.
     """
     # Mock the LLM to return a structured response
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-    mock_llm.return_value = {"age": 35}
+    mocked_llm.return_value = {"age": 35}
 
     # Create a batch request with a schema and field path
     payload = {
@@ -314,7 +331,9 @@ async def test_batch_endpoint_field_extraction(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -331,22 +350,19 @@ async def test_batch_endpoint_field_extraction(
 
 
 async def test_batch_endpoint_multiple_mixed_requests(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
     """Test the batch endpoint with mixed schema and non-schema requests."""
-    # Mock the LLM implementation to handle different calls
-    mock_llm = mocker.patch("api.batch.processor.process_with_llm")
-
-    # Configure the mock to return different values based on input
-    # First call - with schema - returns structured data
-    # Second call - no schema - returns plain text
-    mock_llm.side_effect = [
-        {"age": 35},  # First call with schema
-        "Plain text response",  # Second call without schema
-    ]
+    # Configure the mock to return different values based on input:
+    # structured data for the schema prompt, plain text for the other
+    responses = {
+        "I'm 35 years old": {"age": 35},
+        "Plain text prompt": "Plain text response",
+    }
+    mocked_llm.side_effect = lambda llm_client, prompt, **kwargs: responses[prompt]
 
     # Create a batch request with mixed items
     payload = {
@@ -363,7 +379,9 @@ async def test_batch_endpoint_multiple_mixed_requests(
     }
 
     # Make the request
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Verify success
     assert response.status_code == 200
@@ -385,9 +403,62 @@ async def test_batch_endpoint_multiple_mixed_requests(
     assert second_response["response"] == "Plain text response"
 
 
+# JSON-valid schemas whose structure can't describe a model
+MALFORMED_SCHEMAS = [
+    ("property_not_object", {"properties": {"age": "number"}}),
+    ("properties_as_list", {"properties": [{"age": {"type": "number"}}]}),
+    ("schema_not_object", ["age"]),
+    ("underscore_property", {"properties": {"_id": {"type": "string"}}}),
+    ("empty_enum", {"properties": {"kind": {"type": "string", "enum": []}}}),
+]
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [case[1] for case in MALFORMED_SCHEMAS],
+    ids=[case[0] for case in MALFORMED_SCHEMAS],
+)
+async def test_malformed_schema_is_an_error_response(
+    async_client: AsyncClient,
+    mocked_llm: Any,
+    auth_headers: Dict[str, str],
+    schema: Any,
+) -> None:
+    """Test that a schema that can't be built is an error response, not a 500."""
+    prompt_request = {
+        "prompt": "I'm 35 years old",
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "DynamicSchema", "schema": schema},
+        },
+    }
+
+    response = await async_client.post(
+        "/api/v1/prompt", json=prompt_request, headers=auth_headers
+    )
+    assert response.status_code == 200
+    single = response.json()
+    assert single["status"] == "error"
+    assert single["error"]
+
+    # The batch reports it as that item's error and still answers the others
+    mocked_llm.return_value = "Plain text response"
+    response = await async_client.post(
+        "/api/v1/prompts",
+        json={"prompts": [prompt_request, {"prompt": "Plain text prompt"}]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    bad, good = response.json()["responses"]
+    assert bad["status"] == "error"
+    assert bad["error"] == single["error"]
+    assert good["response"] == "Plain text response"
+    mocked_llm.assert_called_once()
+
+
 @pytest.mark.llm
 async def test_prompts_endpoint_end_to_end_integration(
-    client: AsyncClient,
+    async_client: AsyncClient,
     auth_headers: Dict[str, str],
     apps_script_format_schema: Dict[str, Any],
 ) -> None:
@@ -438,7 +509,9 @@ async def test_prompts_endpoint_end_to_end_integration(
     }
 
     # Make the request to the real API without mocking
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Basic response validation
     assert response.status_code == 200
@@ -473,7 +546,7 @@ async def test_prompts_endpoint_end_to_end_integration(
 
 @pytest.mark.llm
 async def test_person_schema_extraction_integration(
-    client: AsyncClient, auth_headers: Dict[str, str]
+    async_client: AsyncClient, auth_headers: Dict[str, str]
 ) -> None:
     """
     End-to-end integration test using a more complex schema for person information.
@@ -526,7 +599,9 @@ async def test_person_schema_extraction_integration(
     }
 
     # Make the request to the real API without mocking
-    response = await client.post("/api/v1/prompts", json=payload, headers=auth_headers)
+    response = await async_client.post(
+        "/api/v1/prompts", json=payload, headers=auth_headers
+    )
 
     # Basic response validation
     assert response.status_code == 200
@@ -648,8 +723,8 @@ async def test_person_schema_extraction_integration(
 )
 @pytest.mark.llm
 async def test_enum_schema_extraction_integration(
-    client: AsyncClient,
-    mocker: Any,
+    async_client: AsyncClient,
+    mocked_llm: Any,
     auth_headers: Dict[str, str],
     schema_format: Dict[str, Any],
     field_path: str,
@@ -687,10 +762,7 @@ async def test_enum_schema_extraction_integration(
         logger.info("Mock returning: plain text")
         return "Mock response when no model is provided"
 
-    # Apply the mock to the correct module where the function is called
-    mocker.patch(
-        "api.routes.prompts.process_with_llm", side_effect=mock_process_with_llm
-    )
+    mocked_llm.side_effect = mock_process_with_llm
 
     # Create a request with enum schema
     request = PromptRequest(
@@ -698,7 +770,7 @@ async def test_enum_schema_extraction_integration(
     )
 
     # Make the request and WAIT for the result
-    response = await client.post(
+    response = await async_client.post(
         "/api/v1/prompt", json=request.model_dump(), headers=auth_headers
     )
 
@@ -713,7 +785,7 @@ async def test_enum_schema_extraction_integration(
 
 @pytest.mark.llm
 async def test_enum_schema_real_integration(
-    client: AsyncClient,
+    async_client: AsyncClient,
     auth_headers: Dict[str, str],
 ) -> None:
     """
@@ -785,7 +857,7 @@ async def test_enum_schema_real_integration(
         )
 
         # Make the request to the real API
-        response = await client.post(
+        response = await async_client.post(
             "/api/v1/prompt", json=request.model_dump(), headers=auth_headers
         )
 
@@ -853,7 +925,7 @@ async def test_enum_schema_real_integration(
     }
 
     # Make the batch request
-    batch_response = await client.post(
+    batch_response = await async_client.post(
         "/api/v1/prompts", json=batch_request, headers=auth_headers
     )
 
@@ -883,7 +955,7 @@ async def test_enum_schema_real_integration(
 
 @pytest.mark.llm
 def test_structured_output_integration(
-    client: AsyncClient, auth_headers: Dict[str, str]
+    async_client: AsyncClient, auth_headers: Dict[str, str]
 ) -> None:
     # This test is not provided in the original file or the code block
     # It's assumed to exist as it's called in the